@@ -1,15 +1,25 @@
 """A module for placing the global matching algorithm.
 
 This module is a global matching algorithm for Clover to enable global matching mode. 
-Note that Clover itself does not provide a complete global matching algorithm, 
-as there are many mature global matching algorithms available. Therefore, this module 
-currently only provides a simple global matching example algorithm to demonstrate the 
-most basic global matching functionality. If you want to use global matching mode, we 
-recommend that you replace the global matching algorithm with the following function format.
+global_align is a simple positional comparison that you can replace with your own
+global matching algorithm, keeping its function format. myers_align is the built-in
+aligner: an edit distance alignment computed with Myers' bit-parallel algorithm, which
+also reports insertions and deletions in the same error list format.
 
 typical usage example:
 
+    errors = myers_align(core_read, read)
+    errors_of_reads = batch_align(core_read, reads)
+    distances = pair_distances(core_reads, reads)
+
 """
+
+import numpy as np
+
+from clover import hashing as hs
+
+WORD_BITS = 64
+
 def global_align(read_1,read_2):
     """Global Matching Algorithm
 
@@ -35,3 +45,256 @@ def global_align(read_1,read_2):
     return error_list
 
 
+def pattern_masks(read_1):
+    """Bit vector of the positions of each base of read_1, bit i is set where read_1[i] is the base."""
+    masks = {}
+    for i, base in enumerate(read_1):
+        masks[base] = masks.get(base, 0) | (1 << i)
+    return masks
+
+
+def myers_columns(read_1, read_2, masks=None):
+    """Columns of the edit distance matrix of two sequences with Myers' bit-parallel algorithm.
+
+    Column j of the matrix, the distances between the prefixes of read_1
+    and the first j bases of read_2, is stored as the bit vectors of its
+    differences: bit i of the first two is set where D[i + 1][j] - D[i][j]
+    is +1 and -1, of the last two where D[i + 1][j] - D[i + 1][j - 1] is +1
+    and -1. Each base of read_2 costs a few int operations over the whole
+    of read_1.
+
+    Args:
+        read_1: str,The sequence along the rows of the matrix.
+        read_2: str,The sequence along the columns of the matrix.
+        masks: dict,pattern_masks of read_1, computed if None.
+
+    Returns:
+        Returns the edit distance and the list of the len(read_2) + 1 columns.
+    """
+    if masks is None:
+        masks = pattern_masks(read_1)
+    full = (1 << len(read_1)) - 1
+    high = 1 << len(read_1) >> 1
+    pv, mv = full, 0
+    score = len(read_1)
+    columns = [(pv, mv, 0, 0)]
+    for base in read_2:
+        eq = masks.get(base, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & full)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        # the top row of a global alignment grows by 1 at each column
+        ph_shift = ((ph << 1) | 1) & full
+        mh_shift = (mh << 1) & full
+        pv = mh_shift | (~(xv | ph_shift) & full)
+        mv = ph_shift & xv
+        columns.append((pv, mv, ph, mh))
+    if not read_1:
+        score = len(read_2)
+    return score, columns
+
+
+def edit_distance(read_1, read_2, masks=None):
+    """Edit distance of two sequences, see myers_columns."""
+    return myers_columns(read_1, read_2, masks)[0]
+
+
+def myers_align(read_1, read_2, band=None, masks=None):
+    """Global Matching Algorithm with insertions and deletions
+
+    Align two sequences with the smallest number of substitutions, insertions
+    and deletions. Their common prefix and suffix are matched directly, the
+    rest is aligned from the bit vectors of myers_columns and the traceback
+    only visits the cells of the alignment path.
+
+    The errors have the format of global_align: a position of read_1 and the
+    bases of read_2 that replace the base at that position, which is the
+    base of read_2 for a substitution, "" for a deletion, and the base of
+    read_1 followed by the inserted bases for an insertion after it.
+    Replacing the bases of read_1 at every position of the list gives read_2.
+
+    Args:
+        read_1: str,The first sequence that is compared and is in the core set of sequences.
+        read_2: str,The second sequence of the comparison and is the post-match sequence.
+        band: int,Largest edit distance that is traced back, None for no limit.
+        masks: dict,pattern_masks of read_1, computed if None.
+
+    Returns:
+        Returns a list of (position, bases) tuples in position order, or None
+        if the edit distance is larger than band.
+    """
+    if read_1 == read_2:
+        return []
+    if not read_1:
+        return [(0, read_2)] if band is None or len(read_2) <= band else None
+    # a common prefix or suffix does not change the edit distance
+    start = 0
+    shortest = min(len(read_1), len(read_2))
+    while start < shortest and read_1[start] == read_2[start]:
+        start += 1
+    end = 0
+    while end < shortest - start and read_1[-1 - end] == read_2[-1 - end]:
+        end += 1
+    core_1 = read_1[start:len(read_1) - end]
+    core_2 = read_2[start:len(read_2) - end]
+    if masks is not None:
+        low = (1 << len(core_1)) - 1
+        masks = {base: mask >> start & low for base, mask in masks.items()}
+    score, columns = myers_columns(core_1, core_2, masks)
+    if band is not None and score > band:
+        return None
+
+    def vertical(i, j):
+        # D[i][j] - D[i - 1][j]
+        pv, mv, ph, mh = columns[j]
+        return (pv >> (i - 1) & 1) - (mv >> (i - 1) & 1)
+
+    def horizontal(i, j):
+        # D[i][j] - D[i][j - 1]
+        if i == 0:
+            return 1
+        pv, mv, ph, mh = columns[j]
+        return (ph >> (i - 1) & 1) - (mh >> (i - 1) & 1)
+
+    bases = list(read_1)
+    inserted = [[] for _ in range(len(read_1))]
+    leading = inserted[start - 1] if start > 0 else []
+    i, j, d = len(core_1), len(core_2), score
+    while i > 0 or j > 0:
+        if i > 0 and j > 0 and core_1[i - 1] == core_2[j - 1]:
+            # a match is always on an optimal path, D[i][j] == D[i - 1][j - 1]
+            i, j = i - 1, j - 1
+            continue
+        up = vertical(i, j) if i > 0 else 0
+        if i > 0 and j > 0:
+            diagonal = d - up - horizontal(i - 1, j)
+            if diagonal + 1 == d:
+                bases[start + i - 1] = core_2[j - 1]
+                i, j, d = i - 1, j - 1, diagonal
+                continue
+        if up == 1:
+            bases[start + i - 1] = ""
+            i -= 1
+            d -= 1
+            continue
+        # insertion of core_2[j - 1] after core_1[i - 1], or after the common prefix
+        (inserted[start + i - 1] if i > 0 else leading).append(core_2[j - 1])
+        j -= 1
+        d -= 1
+    if start == 0:
+        bases[0] = "".join(reversed(leading)) + bases[0]
+    error_list = []
+    for i, base in enumerate(read_1):
+        aligned = bases[i] + "".join(reversed(inserted[i]))
+        if aligned != base:
+            error_list.append((i, aligned))
+    return error_list
+
+
+def batch_align(read_1, reads, band=None):
+    """myers_align of many sequences against one core sequence, whose bit vectors are built once.
+
+    Args:
+        read_1: str,The sequence in the core set of sequences.
+        reads: list,Sequences compared with read_1.
+        band: int,Largest edit distance that is traced back, see myers_align.
+
+    Returns:
+        Returns the list of errors of each sequence, in the order of reads.
+    """
+    masks = pattern_masks(read_1)
+    return [myers_align(read_1, read_2, band, masks) for read_2 in reads]
+
+
+def add_words(a, b):
+    """Sum of two multi-word integers given as lists of word arrays, in increasing order."""
+    out = []
+    carry = None
+    for word_a, word_b in zip(a, b):
+        total = word_a + word_b
+        overflow = total < word_a
+        if carry is not None:
+            total += carry
+            overflow |= total < carry
+        out.append(total)
+        carry = overflow.astype(np.uint64)
+    return out
+
+
+def shift_words(a, fill=0):
+    """Multi-word integer given as a list of word arrays shifted left by one bit, fill entering at bit 0."""
+    one = np.uint64(1)
+    top = np.uint64(WORD_BITS - 1)
+    out = [(a[0] << one) | np.uint64(fill)]
+    for w in range(1, len(a)):
+        out.append((a[w] << one) | (a[w - 1] >> top))
+    return out
+
+
+def pair_distances(read_1s, read_2s, block_size=4096):
+    """Edit distances of many pairs of sequences at once.
+
+    myers_columns vectorized with numpy over the pairs, the bit vectors of
+    each read_1 are split into 64-bit words. Bases other than ATGC never
+    match. Bits past the end of a shorter read_1 only carry upwards, so
+    they do not change its distance.
+
+    Args:
+        read_1s: list,First sequence of each pair.
+        read_2s: list,Second sequence of each pair.
+        block_size: int,Number of pairs computed together, small enough
+            for the bit vectors to stay in cache.
+
+    Returns:
+        Returns an int64 array of the edit distance of each pair.
+    """
+    if len(read_1s) > block_size:
+        return np.concatenate([pair_distances(read_1s[k:k + block_size], read_2s[k:k + block_size], block_size)
+                               for k in range(0, len(read_1s), block_size)])
+    pair_nums = len(read_1s)
+    len_1 = np.array([len(read) for read in read_1s], dtype=np.int64)
+    len_2 = np.array([len(read) for read in read_2s], dtype=np.int64)
+    if pair_nums == 0:
+        return np.zeros(0, dtype=np.int64)
+    word_nums = max(1, -(-int(len_1.max()) // WORD_BITS))
+    codes_1 = hs.encode_reads(read_1s, word_nums * WORD_BITS)
+    codes_2 = hs.encode_reads(read_2s, max(1, int(len_2.max())))
+    # masks[w][c * pair_nums + p] is word w of the bit vector of the positions of the base of code c in read_1 of pair p
+    masks = np.zeros((len(hs.BASE_VAL) + 1, pair_nums, word_nums), dtype=np.uint64)
+    for code in hs.BASE_VAL.values():
+        bits = np.packbits(codes_1 == code, axis=1, bitorder="little")
+        masks[code] = bits.view("<u8").astype(np.uint64).reshape(pair_nums, word_nums)
+    masks = [np.ascontiguousarray(masks[:, :, w]).reshape(-1) for w in range(word_nums)]
+    rows = np.arange(pair_nums)
+    high = np.maximum(len_1 - 1, 0)
+    high_word, high_bit = high // WORD_BITS, (high % WORD_BITS).astype(np.uint64)
+    high_mask = [(high_word == w) * (np.uint64(1) << high_bit) for w in range(word_nums)]
+    # bits of all the positions of read_1, and above, start at +1
+    pv = [np.full(pair_nums, 2 ** WORD_BITS - 1, dtype=np.uint64) for _ in range(word_nums)]
+    mv = [np.zeros(pair_nums, dtype=np.uint64) for _ in range(word_nums)]
+    score = len_1.copy()
+    for j in range(codes_2.shape[1]):
+        index = codes_2[:, j].astype(np.int64) * pair_nums + rows
+        eq = [np.take(mask, index) for mask in masks]
+        xv = [e | m for e, m in zip(eq, mv)]
+        total = add_words([e & p for e, p in zip(eq, pv)], pv)
+        xh = [(t ^ p) | e for t, p, e in zip(total, pv, eq)]
+        ph = [m | ~(x | p) for m, x, p in zip(mv, xh, pv)]
+        mh = [p & x for p, x in zip(pv, xh)]
+        up = np.zeros(pair_nums, dtype=bool)
+        down = np.zeros(pair_nums, dtype=bool)
+        for w in range(word_nums):
+            up |= (ph[w] & high_mask[w]) != 0
+            down |= (mh[w] & high_mask[w]) != 0
+        active = j < len_2
+        score += (up & active).astype(np.int64) - (down & active).astype(np.int64)
+        ph = shift_words(ph, 1)
+        mh = shift_words(mh)
+        pv = [m | ~(x | p) for m, x, p in zip(mh, xv, ph)]
+        mv = [p & x for p, x in zip(ph, xv)]
+    return np.where(len_1 == 0, len_2, score)
@@ -0,0 +1,167 @@
+"""Benchmark Module
+
+This module measures the throughput of Clover on reproducible synthetic data
+(see clover/simulate.py) or on an input file. The stages of the fast mode
+pipeline are run one after another in a single process and timed
+separately, and the timings, reads per second, peak memory and clustering
+statistics are written to a JSON report.
+
+Usage:
+    python -m clover.benchmark -N 10000 -C 10 -L 150 -o report.json
+
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from clover import evaluate as ev
+from clover import hashing as hs
+from clover import load_config as lc
+from clover import main as cm
+from clover import output as op
+from clover import reader as rd
+from clover import simulate as sm
+from clover import store as rs
+
+
+def peak_rss_mb():
+    """Peak resident memory of the process in MiB, None where it is unknown."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KiB elsewhere
+    return rss / 2 ** 20 if sys.platform == "darwin" else rss / 2 ** 10
+
+
+def probe_indexes(process, hashes):
+    """Replay the sketch index lookups of a hash matrix on the indexes of a process."""
+    match = process.match
+    return sum(match(read_hashes) is not None for read_hashes in hashes.tolist())
+
+
+def run_benchmark(input_path, read_len, tag_nums=None, batch_size=100000, output_format="tsv"):
+    """Cluster an input file stage by stage and time each stage.
+
+    The stages are parsing and packing the input ("parse"), fragment hashing
+    ("hash"), assigning the reads to clusters ("cluster"), writing the output
+    ("output") and scoring the clusters against the read tags ("evaluate").
+    The "index" stage replays the fragment index lookups of all the reads on
+    the final indexes, its time is part of the cluster stage and is not
+    counted in the total.
+
+    Args:
+        input_path: str,Path of the tagged input file.
+        read_len: int,Length of read.
+        tag_nums: int,Number of distinct tags, used for coverage and redundancy.
+        batch_size: int,Number of records in a chunk.
+        output_format: str,Format of the output written in the output stage.
+
+    Returns:
+        Returns the report as a dict.
+    """
+    process = cm.MyProcess("all", [], None, lc.default_config({"read_len": read_len}))
+    stages = {}
+
+    start = time.perf_counter()
+    chunks = [rs.PackedReads.from_records(chunk) for chunk in rd.read_chunks(input_path, batch_size)]
+    stages["parse"] = time.perf_counter() - start
+    read_nums = sum(len(chunk) for chunk in chunks)
+
+    start = time.perf_counter()
+    hashes = [hs.hash_packed(chunk, read_len, process.fragment_len, process.sketch_offsets, process.sketch_window)
+              for chunk in chunks]
+    stages["hash"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    read_len_min = process.config.read_len_min
+    for chunk, chunk_hashes in zip(chunks, hashes):
+        keep = np.flatnonzero(chunk.lengths() >= read_len_min)
+        tags = chunk.tags()
+        process.assign_batch([tags[i] for i in keep.tolist()], chunk_hashes[keep])
+    stages["cluster"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for chunk_hashes in hashes:
+        probe_indexes(process, chunk_hashes)
+    index_time = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        start = time.perf_counter()
+        op.write_clusters(os.path.join(output_dir, "clusters." + output_format), process.cluster_table.members(),
+                          process.read_tags, output_format)
+        stages["output"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    stats = ev.evaluate(np.array(process.cluster_table.read_cluster, dtype=np.int64), process.read_tags, tag_nums)
+    stages["evaluate"] = time.perf_counter() - start
+
+    total = sum(stages.values())
+    stages["index"] = index_time
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "input": input_path,
+        "read_len": read_len,
+        "reads": read_nums,
+        "clustered_reads": len(process.read_tags),
+        "stages": {name: {"seconds": seconds, "reads_per_sec": read_nums / seconds if seconds else None}
+                   for name, seconds in stages.items()},
+        "total_seconds": total,
+        "reads_per_sec": read_nums / total if total else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "statistics": {key: value for key, value in stats.items() if key != "size_histogram"},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m clover.benchmark", description="Benchmark Clover on synthetic reads.")
+    parser.add_argument("-I", dest="input", help="tagged input file, synthetic reads are generated if it is not given")
+    parser.add_argument("-T", dest="tag_nums", type=int, help="number of tags of the input file")
+    parser.add_argument("-N", dest="ref_nums", type=int, default=10000, help="number of reference strands")
+    parser.add_argument("-C", dest="coverage", type=int, default=10, help="reads per reference")
+    parser.add_argument("-L", dest="read_len", type=int, default=150, help="length of read")
+    parser.add_argument("--sub", type=float, default=0.01, help="substitution rate")
+    parser.add_argument("--ins", type=float, default=0.01, help="insertion rate")
+    parser.add_argument("--del", dest="dele", type=float, default=0.01, help="deletion rate")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--batch-size", type=int, default=100000, help="records per chunk")
+    parser.add_argument("--output-format", default="tsv", choices=op.OUTPUT_FORMATS, help="format of the output stage")
+    parser.add_argument("-o", dest="report", help="JSON report file, printed if it is not given")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        if args.input is None:
+            input_path = os.path.join(data_dir, "reads.txt")
+            start = time.perf_counter()
+            sm.write_reads(input_path, sm.simulate_reads(args.ref_nums, args.coverage, args.read_len,
+                                                         args.sub, args.ins, args.dele, args.seed))
+            simulate_time = time.perf_counter() - start
+            tag_nums = args.ref_nums
+        else:
+            input_path, simulate_time, tag_nums = args.input, None, args.tag_nums
+        report = run_benchmark(input_path, args.read_len, tag_nums, args.batch_size, args.output_format)
+    report["simulation"] = None if args.input else {
+        "ref_nums": args.ref_nums, "coverage": args.coverage, "sub_rate": args.sub, "ins_rate": args.ins,
+        "del_rate": args.dele, "seed": args.seed, "seconds": simulate_time}
+
+    text = json.dumps(report, indent=2)
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Checkpoint Module
+
+This module saves and loads the snapshots of the processes of a long run.
+A snapshot is a NumPy .npz file per process holding its fragment indexes,
+cluster table, read tags and the number of input reads it has consumed.
+Snapshots are written to a temporary file first and renamed, so a crash
+while saving leaves the previous snapshot intact.
+
+The clustering state kept between runs with --state uses the same files,
+together with a list of the partitions the state was made with.
+
+"""
+
+import json
+import os
+
+import numpy as np
+
+
+def snapshot_path(checkpoint_dir, name):
+    """Path of the snapshot of the process called name."""
+    return os.path.join(checkpoint_dir, name + ".npz")
+
+
+def save(path, arrays):
+    """Atomically write a dict of arrays to a snapshot file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = path[:-len(".npz")] + ".tmp.npz"
+    np.savez(temp_path, **arrays)
+    os.replace(temp_path, path)
+
+
+def load(path):
+    """Arrays of a snapshot file as a dict, None if there is no snapshot."""
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def remove(checkpoint_dir, names):
+    """Remove the snapshots of the given processes and their partitions once a run has finished."""
+    for path in [snapshot_path(checkpoint_dir, name) for name in names] + [partitions_path(checkpoint_dir)]:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def partitions_path(state_dir):
+    """Path of the list of the partitions the snapshots of a directory were made with."""
+    return os.path.join(state_dir, "partitions.json")
+
+
+def record_partitions(state_dir, names):
+    """Record the process names the snapshots of a directory are made with."""
+    os.makedirs(state_dir, exist_ok=True)
+    with open(partitions_path(state_dir), "w") as f:
+        json.dump(list(names), f)
+
+
+def check_partitions(state_dir, names):
+    """Record the process names of a state, or check them against the recorded ones.
+
+    Reads are routed to the processes by prefix or hash bucket, a state can
+    only be extended, and a checkpointed run resumed, by a run partitioning
+    its input the same way.
+
+    Raises:
+        ValueError: The state was made with other partitions.
+    """
+    path = partitions_path(state_dir)
+    if os.path.exists(path):
+        with open(path) as f:
+            state_names = json.load(f)
+        if state_names != list(names):
+            raise ValueError("The snapshots in %s were made with %d other partitions" % (state_dir, len(state_names)))
+        return
+    record_partitions(state_dir, names)
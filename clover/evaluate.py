@@ -0,0 +1,109 @@
+"""Evaluation Module
+
+This module scores a clustering of tagged reads against their tags, the
+true cluster of each read. All the statistics are computed with NumPy
+group-by operations on the cluster id and tag code of each read.
+
+"""
+
+import numpy as np
+
+
+def factorize(tags):
+    """Integer code of each tag, numbered from 0 in order of first appearance.
+
+    Returns:
+        Returns a tuple with the int64 array of codes and the list of the
+        distinct tags.
+    """
+    codes = {}
+    tag_codes = np.fromiter((codes.setdefault(tag, len(codes)) for tag in tags), dtype=np.int64, count=len(tags))
+    return tag_codes, list(codes)
+
+
+def contingency(read_cluster, tag_codes):
+    """Sparse contingency table of clusters and tags.
+
+    Returns:
+        Returns a tuple with the cluster, the tag and the number of reads of
+        each non-empty cell, sorted by cluster.
+    """
+    tag_nums = int(tag_codes.max()) + 1 if len(tag_codes) else 1
+    cells, counts = np.unique(read_cluster * tag_nums + tag_codes, return_counts=True)
+    return cells // tag_nums, cells % tag_nums, counts
+
+
+def pair_nums(counts):
+    """Number of pairs of items in groups of the given sizes."""
+    counts = np.asarray(counts, dtype=np.float64)
+    return float((counts * (counts - 1) / 2).sum())
+
+
+def adjusted_rand_index(cluster_sizes, tag_sizes, cell_counts):
+    """Adjusted Rand index of a clustering from its contingency table margins and cells."""
+    sum_cells = pair_nums(cell_counts)
+    sum_clusters = pair_nums(cluster_sizes)
+    sum_tags = pair_nums(tag_sizes)
+    total = pair_nums([np.sum(cell_counts)])
+    if total == 0:
+        return 1.0
+    expected = sum_clusters * sum_tags / total
+    maximum = (sum_clusters + sum_tags) / 2
+    if maximum == expected:
+        return 1.0
+    return (sum_cells - expected) / (maximum - expected)
+
+
+def evaluate(read_cluster, read_tags, tag_nums=None, cluster_size_threshold=1):
+    """Statistics of a clustering of tagged reads.
+
+    Accuracy, coverage and redundancy follow Clover's definitions: they only
+    count clusters with more than cluster_size_threshold reads, a read is an
+    error if its tag differs from the majority tag of its cluster, and a tag
+    is covered if it is the tag of the first read of a counted cluster.
+    Purity and the adjusted Rand index are computed on all the clusters.
+
+    Args:
+        read_cluster: numpy.ndarray,Cluster id of each read, reads in
+            clustering order.
+        read_tags: list,Tag of each read.
+        tag_nums: int,Total number of tags, coverage and redundancy are None
+            if it is not given.
+        cluster_size_threshold: int,Clusters with no more reads are not counted.
+
+    Returns:
+        Returns a dict with the number of reads ("reads"), of reads in counted
+        clusters ("counted_reads"), of errors ("errors"), of counted clusters
+        ("clusters"), the "accuracy", "coverage", "redundancy", "purity" and
+        "ari", and the "size_histogram" list giving the number of clusters of
+        each size.
+    """
+    read_cluster = np.asarray(read_cluster, dtype=np.int64)
+    tag_codes, _ = factorize(read_tags)
+    read_nums = len(read_cluster)
+    cluster_nums = int(read_cluster.max()) + 1 if read_nums else 0
+
+    sizes = np.bincount(read_cluster, minlength=cluster_nums)
+    cell_cluster, _, cell_counts = contingency(read_cluster, tag_codes)
+    majority = np.zeros(cluster_nums, dtype=np.int64)
+    np.maximum.at(majority, cell_cluster, cell_counts)
+    first = np.full(cluster_nums, read_nums, dtype=np.int64)
+    np.minimum.at(first, read_cluster, np.arange(read_nums, dtype=np.int64))
+
+    counted = sizes > cluster_size_threshold
+    counted_reads = int(sizes[counted].sum())
+    errors = counted_reads - int(majority[counted].sum())
+    counted_clusters = int(counted.sum())
+    covered = len(np.unique(tag_codes[first[counted]]))
+    return {
+        "reads": read_nums,
+        "counted_reads": counted_reads,
+        "errors": errors,
+        "clusters": counted_clusters,
+        "accuracy": (counted_reads - errors) / counted_reads if counted_reads else 0.0,
+        "coverage": covered / tag_nums if tag_nums else None,
+        "redundancy": (counted_clusters - tag_nums) / tag_nums if tag_nums else None,
+        "purity": int(majority.sum()) / read_nums if read_nums else 0.0,
+        "ari": adjusted_rand_index(sizes, np.bincount(tag_codes), cell_counts),
+        "size_histogram": np.bincount(sizes[sizes > 0]).tolist(),
+    }
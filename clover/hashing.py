@@ -0,0 +1,262 @@
+"""Fragment Hashing Module
+
+This module computes DUHI hash values of DNA fragments. Besides the scalar
+formula, it provides a batch path that encodes a chunk of reads into a NumPy
+base matrix once and hashes the fragments of every read with array arithmetic.
+
+The fragments of a read form its sketch. By default these are the
+middle-front, middle and middle-back 8-base fragments; any number of
+fragments of any length at chosen offsets can be used instead. With a
+window w, the hash of the fragment at an offset is the smallest hash of the
+w fragments starting at the offset and the w - 1 following positions (a
+minimizer), so a base inserted or deleted before it shifts the selected
+fragment instead of changing its hash.
+
+For drift tolerant lookups, the hashes of every fragment shifted by each of
+a list of drifts are computed with a rolling hash, one column update per
+shift instead of a full rehash.
+
+"""
+
+import numpy as np
+
+FRAGMENT_LEN = 8
+# Longest fragment whose hashes fit the 32 bit arrays of table.ClusterTable
+MAX_FRAGMENT_LEN = 30
+
+BASE_VAL = {'A': 1, 'T': 2, 'G': 3, 'C': 4}
+
+# ASCII code -> DUHI base value, any other character counts as 0
+BASE_TABLE = np.zeros(256, dtype=np.uint8)
+for _base, _val in BASE_VAL.items():
+    BASE_TABLE[ord(_base)] = _val
+
+
+def hash_value(fragment, fragment_len=FRAGMENT_LEN):
+    """DUHI's hash formula for DNA fragment."""
+    return sum((2 ** (fragment_len - 1 - i)) * BASE_VAL[char] for i, char in enumerate(fragment))
+
+
+def fragment_offsets(read_len, fragment_len=FRAGMENT_LEN):
+    """Start positions of the middle-front, middle and middle-back fragments.
+
+    Args:
+        read_len: int,Length of read.
+        fragment_len: int,Length of each fragment.
+
+    Returns:
+        Returns a tuple with the start position of each fragment.
+    """
+    middle_start = read_len // 3
+    return (
+        middle_start,
+        read_len // 2 - fragment_len // 2,
+        2 * middle_start - fragment_len,
+    )
+
+
+def spaced_offsets(read_len, fragment_nums, fragment_len=FRAGMENT_LEN, window=1):
+    """Start positions of fragments spread evenly over the whole read.
+
+    Args:
+        read_len: int,Length of read.
+        fragment_nums: int,Number of fragments.
+        fragment_len: int,Length of each fragment.
+        window: int,Minimizer window of each fragment.
+
+    Returns:
+        Returns a tuple with the start position of each fragment, the last
+        window ends at the end of the read.
+    """
+    span = max(read_len - fragment_len - window + 1, 0)
+    if fragment_nums == 1:
+        return (span // 2,)
+    return tuple(i * span // (fragment_nums - 1) for i in range(fragment_nums))
+
+
+def sketch_width(offsets, fragment_len=FRAGMENT_LEN, window=1, drifts=(0,)):
+    """Number of leading bases of a read needed to hash its sketch."""
+    return max(offsets) + max(max(drifts), 0) + fragment_len + window - 1
+
+
+def encode_reads(seqs, width):
+    """Encode the first bases of a chunk of reads into a base matrix.
+
+    Args:
+        seqs: list,Sequences to be encoded.
+        width: int,Number of leading bases kept for each sequence.
+
+    Returns:
+        Returns a uint8 matrix of shape (len(seqs), width) holding the DUHI
+        value of each base. Positions past the end of a read are 0.
+    """
+    buf = "".join([s[:width].ljust(width, "\0") for s in seqs]).encode("ascii", "replace")
+    return BASE_TABLE[np.frombuffer(buf, dtype=np.uint8).reshape(len(seqs), width)]
+
+
+def hash_matrix(codes, offsets, fragment_len=FRAGMENT_LEN, window=1):
+    """DUHI hash values of the fragments at the given offsets of a base matrix.
+
+    Args:
+        codes: numpy.ndarray,Base matrix built by encode_reads.
+        offsets: tuple,Start position of each fragment.
+        fragment_len: int,Length of each fragment.
+        window: int,Minimizer window, the smallest hash of the fragments
+            starting at offset to offset + window - 1 is kept.
+
+    Returns:
+        Returns an int64 matrix of shape (len(codes), len(offsets)).
+    """
+    weights = 2 ** np.arange(fragment_len - 1, -1, -1, dtype=np.int64)
+    hashes = np.empty((codes.shape[0], len(offsets)), dtype=np.int64)
+    for j, offset in enumerate(offsets):
+        if window == 1:
+            hashes[:, j] = codes[:, offset:offset + fragment_len] @ weights
+        else:
+            span = codes[:, offset:offset + fragment_len + window - 1]
+            hashes[:, j] = (np.lib.stride_tricks.sliding_window_view(span, fragment_len, axis=1) @ weights).min(axis=1)
+    return hashes
+
+
+def drift_matrix(codes, offsets, fragment_len=FRAGMENT_LEN, window=1, drifts=(0,)):
+    """DUHI hash values of the fragments at the given offsets shifted by each drift.
+
+    The hashes of consecutive positions are computed with the rolling
+    update h(i + 1) = 2 * (h(i) - 2^(fragment_len - 1) * b(i)) + b(i + fragment_len),
+    one pass over the drift span of each fragment.
+
+    Args:
+        codes: numpy.ndarray,Base matrix built by encode_reads.
+        offsets: tuple,Start position of each fragment.
+        fragment_len: int,Length of each fragment.
+        window: int,Minimizer window, see hash_matrix.
+        drifts: tuple,Shifts of the fragments, in the order of the result.
+
+    Returns:
+        Returns an int64 array of shape (len(codes), len(offsets), len(drifts)).
+        Fragments shifted before the start of the read have the hash -1.
+    """
+    weights = 2 ** np.arange(fragment_len - 1, -1, -1, dtype=np.int64)
+    top = int(weights[0])
+    low, high = min(drifts), max(drifts)
+    hashes = np.full((codes.shape[0], len(offsets), len(drifts)), -1, dtype=np.int64)
+    for j, offset in enumerate(offsets):
+        start = max(offset + low, 0)
+        stop = offset + high + window
+        if start >= stop:
+            continue
+        # plain fragment hashes of the positions start to stop - 1
+        rolling = np.empty((codes.shape[0], stop - start), dtype=np.int64)
+        rolling[:, 0] = codes[:, start:start + fragment_len] @ weights
+        span = codes[:, start:stop + fragment_len - 1].astype(np.int64)
+        for i in range(1, stop - start):
+            rolling[:, i] = 2 * (rolling[:, i - 1] - top * span[:, i - 1]) + span[:, i + fragment_len - 1]
+        if window > 1:
+            rolling = np.lib.stride_tricks.sliding_window_view(rolling, window, axis=1).min(axis=2)
+        for k, drift in enumerate(drifts):
+            if offset + drift >= start:
+                hashes[:, j, k] = rolling[:, offset + drift - start]
+    return hashes
+
+
+def sketch_matrix(codes, offsets, fragment_len=FRAGMENT_LEN, window=1, drifts=None):
+    """hash_matrix of a base matrix, or its drift_matrix if drifts are given."""
+    if drifts is None:
+        return hash_matrix(codes, offsets, fragment_len, window)
+    return drift_matrix(codes, offsets, fragment_len, window, drifts)
+
+
+def scalar_hash(seqs, offsets, fragment_len=FRAGMENT_LEN, window=1, drifts=None):
+    """Sketch hashes of reads computed one fragment at a time with str slicing.
+
+    Used for very short reads whose fragments wrap around the read end.
+    """
+    def hashes(shifted):
+        return np.array([[min(hash_value(s[offset + i:offset + i + fragment_len], fragment_len) for i in range(window))
+                          for offset in shifted] for s in seqs], dtype=np.int64).reshape(len(seqs), len(shifted))
+    if drifts is None:
+        return hashes(offsets)
+    return np.stack([hashes([offset + drift for offset in offsets]) for drift in drifts], axis=2)
+
+
+def batch_hash(seqs, read_len, fragment_len=FRAGMENT_LEN, offsets=None, window=1, drifts=None):
+    """Sketch DUHI hashes of a chunk of reads.
+
+    The values are identical to hashing the fragments of each read one by
+    one with hash_value.
+
+    Args:
+        seqs: list,Sequences to be hashed.
+        read_len: int,Length of read.
+        fragment_len: int,Length of each fragment.
+        offsets: tuple,Start position of each fragment, the front, middle
+            and back fragments given by fragment_offsets if None.
+        window: int,Minimizer window of each fragment, see hash_matrix.
+        drifts: tuple,Shifts of each fragment, see drift_matrix.
+
+    Returns:
+        Returns an int64 matrix of shape (len(seqs), len(offsets)), or of
+        shape (len(seqs), len(offsets), len(drifts)) if drifts are given.
+    """
+    if offsets is None:
+        offsets = fragment_offsets(read_len, fragment_len)
+    if min(offsets) < 0:
+        # Fragments wrap around the read end for very short reads, keep the slicing semantics
+        return scalar_hash(seqs, offsets, fragment_len, window, drifts)
+    codes = encode_reads(seqs, sketch_width(offsets, fragment_len, window, drifts or (0,)))
+    return sketch_matrix(codes, offsets, fragment_len, window, drifts)
+
+
+def hash_buffer(buf, starts, lengths, read_len, fragment_len=FRAGMENT_LEN, offsets=None, window=1, drifts=None):
+    """Sketch DUHI hashes of reads stored in a byte buffer.
+
+    Bases are gathered directly from the buffer, so reads of a memory-mapped
+    file are hashed without creating a str object for each of them.
+
+    Args:
+        buf: numpy.ndarray,uint8 view over the bytes holding the reads.
+        starts: numpy.ndarray,Position of the first base of each read in buf.
+        lengths: numpy.ndarray,Length of each read.
+        read_len: int,Length of read.
+        fragment_len: int,Length of each fragment.
+        offsets: tuple,Start position of each fragment, see batch_hash.
+        window: int,Minimizer window of each fragment, see hash_matrix.
+        drifts: tuple,Shifts of each fragment, see drift_matrix.
+
+    Returns:
+        Returns an int64 matrix of shape (len(starts), len(offsets)), or of
+        shape (len(starts), len(offsets), len(drifts)) if drifts are given.
+    """
+    if offsets is None:
+        offsets = fragment_offsets(read_len, fragment_len)
+    if min(offsets) < 0:
+        seqs = [bytes(buf[s:s + l]).decode("ascii", "replace") for s, l in zip(starts, lengths)]
+        return scalar_hash(seqs, offsets, fragment_len, window, drifts)
+    cols = np.arange(sketch_width(offsets, fragment_len, window, drifts or (0,)))
+    positions = np.minimum(starts[:, None] + cols, len(buf) - 1)
+    codes = BASE_TABLE[buf[positions]]
+    codes[cols >= lengths[:, None]] = 0
+    return sketch_matrix(codes, offsets, fragment_len, window, drifts)
+
+
+def hash_packed(reads, read_len, fragment_len=FRAGMENT_LEN, offsets=None, window=1, drifts=None):
+    """Sketch DUHI hashes of the reads of a packed store.
+
+    Args:
+        reads: store.PackedReads,Reads to be hashed.
+        read_len: int,Length of read.
+        fragment_len: int,Length of each fragment.
+        offsets: tuple,Start position of each fragment, see batch_hash.
+        window: int,Minimizer window of each fragment, see hash_matrix.
+        drifts: tuple,Shifts of each fragment, see drift_matrix.
+
+    Returns:
+        Returns an int64 matrix of shape (len(reads), len(offsets)), or of
+        shape (len(reads), len(offsets), len(drifts)) if drifts are given.
+    """
+    if offsets is None:
+        offsets = fragment_offsets(read_len, fragment_len)
+    if min(offsets) < 0:
+        return scalar_hash([reads.seq(i) for i in range(len(reads))], offsets, fragment_len, window, drifts)
+    codes = reads.base_values(sketch_width(offsets, fragment_len, window, drifts or (0,)))
+    return sketch_matrix(codes, offsets, fragment_len, window, drifts)
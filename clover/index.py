@@ -0,0 +1,195 @@
+"""Fragment Index Module
+
+This module provides the index used by the hash engine to find the clusters
+whose representative fragment has a given DUHI hash value. A read has one
+index per fragment of its sketch and matches a cluster when match_nums of
+its fragments are found in the cluster's buckets.
+
+"""
+
+import itertools
+
+import numpy as np
+
+from clover import hashing as hs
+
+DENSE_SIZE = 1 << 18
+
+
+def max_hash(fragment_len=hs.FRAGMENT_LEN):
+    """Largest DUHI hash value of a fragment of the given length."""
+    return max(hs.BASE_VAL.values()) * (2 ** fragment_len - 1)
+
+
+def match_groups(fragment_nums, match_nums=2):
+    """Groups of fragments checked in turn to match a read, in lexicographic order.
+
+    With the default 3 fragments and match_nums 2 these are the
+    (front, middle), (front, back) and (middle, back) pairs.
+    """
+    return tuple(itertools.combinations(range(fragment_nums), match_nums))
+
+
+def first_common(bucket_a, bucket_b):
+    """First cluster id found in both buckets.
+
+    The smaller bucket is walked in insertion order and looked up in the
+    larger one, nothing is allocated.
+
+    Args:
+        bucket_a: dict,Bucket of an index.
+        bucket_b: dict,Bucket of another index.
+
+    Returns:
+        Returns the cluster id, or None if the buckets do not intersect.
+    """
+    if len(bucket_a) > len(bucket_b):
+        bucket_a, bucket_b = bucket_b, bucket_a
+    for idx in bucket_a:
+        if idx in bucket_b:
+            return idx
+    return None
+
+
+def first_common_all(buckets):
+    """First cluster id found in all of a list of buckets, in the order of the smallest one.
+
+    The buckets are intersected as key views, smallest first, so a miss
+    costs no Python loop over the ids.
+
+    Returns:
+        Returns the cluster id, or None if the buckets do not intersect.
+    """
+    smallest, *rest = sorted(buckets, key=len)
+    common = smallest.keys()
+    for bucket in rest:
+        common = common & bucket.keys()
+        if not common:
+            return None
+    for idx in smallest:
+        if idx in common:
+            return idx
+    return None
+
+
+def first_shared(buckets, match_nums):
+    """First cluster id found in match_nums of a list of buckets.
+
+    The buckets are walked in turn, each in insertion order, counting the
+    ids seen; the first id counted match_nums times is returned. Ids that
+    first appear once too few buckets are left are not counted. This
+    costs the total size of the buckets rather than one intersection per
+    match group. When all the non-empty buckets must hold the id, the
+    smallest one is walked instead, see first_common_all.
+
+    Args:
+        buckets: list,Bucket of each fragment, None if it is empty.
+        match_nums: int,Number of buckets the id must be found in.
+
+    Returns:
+        Returns the cluster id, or None if no id is in enough buckets.
+    """
+    buckets = [bucket for bucket in buckets if bucket]
+    if len(buckets) < match_nums:
+        return None
+    if match_nums == 1:
+        return next(iter(buckets[0]))
+    if len(buckets) == match_nums:
+        # every bucket must hold the id, only the smallest one is walked
+        return first_common_all(buckets)
+    counts = {}
+    for k, bucket in enumerate(buckets):
+        if len(buckets) - k >= match_nums:
+            for idx in bucket:
+                count = counts.get(idx, 0) + 1
+                if count == match_nums:
+                    return idx
+                counts[idx] = count
+        else:
+            for idx in bucket:
+                count = counts.get(idx)
+                if count is not None:
+                    if count + 1 == match_nums:
+                        return idx
+                    counts[idx] = count + 1
+    return None
+
+
+class SparseBuckets(dict):
+    """Buckets of a FragmentIndex keyed by hash value, a missing bucket reads as None."""
+
+    __slots__ = ()
+
+    def __missing__(self, hash_val):
+        return None
+
+
+class FragmentIndex:
+    """Fragment Index Class
+
+    DUHI hash values are small bounded integers, so buckets are addressed
+    directly by hash value. Each bucket is a dict used as an insertion
+    ordered set of cluster ids, which gives O(1) insertion and removal.
+    Fragments with more than DENSE_SIZE hash values keep their buckets in
+    a SparseBuckets dict instead, which only holds the buckets used.
+
+    Attributes:
+        buckets: list,Bucket of each hash value, None if it was never used,
+            or a SparseBuckets dict for long fragments.
+    """
+
+    __slots__ = ("buckets",)
+
+    def __init__(self, fragment_len=hs.FRAGMENT_LEN):
+        size = max_hash(fragment_len) + 1
+        self.buckets = [None] * size if size <= DENSE_SIZE else SparseBuckets()
+
+    def get(self, hash_val):
+        """Bucket of a hash value, None if it is empty."""
+        return self.buckets[hash_val] or None
+
+    def add(self, hash_val, idx):
+        """Add a cluster id to the bucket of a hash value."""
+        bucket = self.buckets[hash_val]
+        if bucket is None:
+            self.buckets[hash_val] = {idx: None}
+        else:
+            bucket[idx] = None
+
+    def discard(self, hash_val, idx):
+        """Remove a cluster id from the bucket of a hash value."""
+        bucket = self.buckets[hash_val]
+        if bucket is not None:
+            bucket.pop(idx, None)
+
+    def move(self, old_hash, new_hash, idx):
+        """Move a cluster id from one bucket to another."""
+        self.discard(old_hash, idx)
+        self.add(new_hash, idx)
+
+    def items(self):
+        """(hash value, bucket) of every bucket, in hash value order."""
+        if isinstance(self.buckets, SparseBuckets):
+            return sorted(self.buckets.items())
+        return enumerate(self.buckets)
+
+    def __len__(self):
+        return sum(len(bucket) for hash_val, bucket in self.items() if bucket)
+
+    def to_arrays(self):
+        """Hash value and cluster id of every entry, in bucket order and insertion order within a bucket."""
+        hashes = []
+        ids = []
+        for hash_val, bucket in self.items():
+            if bucket:
+                hashes += [hash_val] * len(bucket)
+                ids += list(bucket)
+        return np.array(hashes, dtype=np.int64), np.array(ids, dtype=np.int64)
+
+    @classmethod
+    def from_arrays(cls, hashes, ids, fragment_len=hs.FRAGMENT_LEN):
+        """Rebuild an index saved by to_arrays."""
+        index = cls(fragment_len)
+        for hash_val, idx in zip(np.asarray(hashes).tolist(), np.asarray(ids).tolist()):
+            index.add(hash_val, idx)
+        return index
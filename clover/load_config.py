@@ -1,44 +1,132 @@
 """Module for input parameters.
 
 This module is responsible for importing the input parameters to Clover.
+The configuration of a run is an immutable Config object, built once by the
+driver from its defaults, a JSON file (--config), CLOVER_* environment
+variables and the command line options, in increasing order of priority,
+and passed to the worker processes.
 
 """
 
+import dataclasses
 import json
 import getopt
+import os
 import sys
 
-config_dict={
-    "read_len" : 152,
-    "end_tree_len" : 15, 
-    "other_tree_len" : 15,
-    "other_tree_nums" : 2,
-    "thd_tree_loc" : 40,
-    "four_tree_loc" : 40,
-    "Vertical_drift" : 2,
-    "Horizontal_drift" : 3,
-    "tree_threshold" : 10,
-    "now_clust_threshold" : 8,
-    "tag_nums" : 1,
-    "processes_nums" : 0,
-    "Cluster_size_threshold" : 1,
-    "h_index_nums" : 0,
-    "e_index_nums" : 0,
-    "read_len_min" : 0,
-
-    "align_fuc" : False ,
-    "mmr_mode" : False ,
-    "Virtual_mode" : True,
-    "fast_mode" : True ,
-    "tag_mode" : False,
-    "Statistical_model" : False,
-    "same_tree_len" : True,
-    "now_align_alg" : False,
-
-    #"Cluster_hash_threshold" : 2**7 
-}
-
-opt,args = getopt.getopt(sys.argv[1:],'-I:-L:-D:-V:-H:-T:-P:-O:-h',['help','low','no-fast','no-tag','stat'])
+from clover import hashing as hs
+from clover import output as op
+
+SHORT_OPTS = '-I:-L:-D:-V:-H:-T:-P:-O:-j:-h'
+LONG_OPTS = ['help','low','no-fast','no-tag','stat','mmap','merge','buckets=','output-format=','profile','checkpoint=','resume','state=','config=',
+             'sketch=','fragment-len=','window=','match=','drift','align','verify','verify-distance=','verify-jobs=']
+ENV_PREFIX = "CLOVER_"
+
+TAG="""
+      ___           ___       ___           ___           ___           ___     
+     /\  \         /\__\     /\  \         /\__\         /\  \         /\  \    
+    /::\  \       /:/  /    /::\  \       /:/  /        /::\  \       /::\  \   
+   /:/\:\  \     /:/  /    /:/\:\  \     /:/  /        /:/\:\  \     /:/\:\  \  
+  /:/  \:\  \   /:/  /    /:/  \:\  \   /:/__/  ___   /::\~\:\  \   /::\~\:\  \ 
+ /:/__/ \:\__\ /:/__/    /:/__/ \:\__\  |:|  | /\__\ /:/\:\ \:\__\ /:/\:\ \:\__\\
+ \:\  \  \/__/ \:\  \    \:\  \ /:/  /  |:|  |/:/  / \:\~\:\ \/__/ \/_|::\/:/  /
+  \:\  \        \:\  \    \:\  /:/  /   |:|__/:/  /   \:\ \:\__\      |:|::/  / 
+   \:\  \        \:\  \    \:\/:/  /     \::::/__/     \:\ \/__/      |:|\/__/  
+    \:\__\        \:\__\    \::/  /       ~~~~          \:\__\        |:|  |    
+     \/__/         \/__/     \/__/                       \/__/         \|__|    """
+
+
+@dataclasses.dataclass(frozen=True)
+class Config:
+    """Config Class
+
+    The entries are described in the Customize Config section of the
+    README. read_len_min and verify_distance are derived from read_len
+    when they are 0, Vertical_drift from Horizontal_drift when it is empty
+    and sketch_offsets from read_len and sketch_nums when it is empty.
+
+    Raises:
+        ValueError: The sketch entries are inconsistent.
+    """
+
+    read_len: int = 152
+    end_tree_len: int = 15
+    other_tree_len: int = 15
+    other_tree_nums: int = 2
+    thd_tree_loc: int = 40
+    four_tree_loc: int = 40
+    Vertical_drift: tuple = ()
+    Horizontal_drift: int = 3
+    tree_threshold: int = 10
+    now_clust_threshold: int = 8
+    rep_update_interval: int = 5
+    tag_nums: int = 1
+    processes_nums: int = 0
+    Cluster_size_threshold: int = 1
+    h_index_nums: int = 0
+    e_index_nums: int = 0
+    read_len_min: int = 0
+    batch_size: int = 100000
+    queue_chunks: int = 2
+    jobs: int = 0
+    partition_buckets: int = 0
+    partition_fragment: int = 1
+    output_format: str = "tsv"
+    checkpoint_dir: str = ""
+    checkpoint_interval: float = 600.0
+    state_dir: str = ""
+    fragment_len: int = 8
+    sketch_nums: int = 0
+    sketch_offsets: tuple = ()
+    sketch_window: int = 1
+    match_nums: int = 2
+    verify_distance: int = 0
+    verify_jobs: int = 1
+    input_path: str = ""
+    output_file: str = ""
+
+    align_fuc: bool = False
+    mmr_mode: bool = False
+    Virtual_mode: bool = True
+    fast_mode: bool = True
+    tag_mode: bool = False
+    Statistical_model: bool = False
+    same_tree_len: bool = True
+    now_align_alg: bool = False
+    mmap_mode: bool = False
+    merge_mode: bool = False
+    pool_mode: bool = False
+    profile_mode: bool = False
+    resume_mode: bool = False
+    drift_mode: bool = False
+    verify_mode: bool = False
+
+    #Cluster_hash_threshold: int = 2**7
+
+    def __post_init__(self):
+        # the object is frozen, derived entries are set once here
+        if self.read_len_min == 0 :
+            object.__setattr__(self, 'read_len_min', self.read_len - 5)
+        if self.verify_distance == 0 :
+            object.__setattr__(self, 'verify_distance', self.read_len // 4)
+        if not self.Vertical_drift :
+            object.__setattr__(self, 'Vertical_drift', tuple(generate_vertical_drifts_list(self.Horizontal_drift)))
+        if not self.sketch_offsets :
+            if self.sketch_nums :
+                offsets = hs.spaced_offsets(self.read_len, self.sketch_nums, self.fragment_len, self.sketch_window)
+            else :
+                offsets = hs.fragment_offsets(self.read_len, self.fragment_len)
+            object.__setattr__(self, 'sketch_offsets', tuple(offsets))
+        op.check_format(self.output_format)
+        if self.fragment_len < 1 or self.sketch_window < 1 :
+            raise ValueError("fragment_len and sketch_window must be positive")
+        if self.fragment_len > hs.MAX_FRAGMENT_LEN :
+            raise ValueError("fragment_len must be at most %d" % hs.MAX_FRAGMENT_LEN)
+        if not 1 <= self.match_nums <= len(self.sketch_offsets) :
+            raise ValueError("match_nums must be between 1 and the %d sketch fragments" % len(self.sketch_offsets))
+
+
+FIELD_TYPES = {field.name: field.type for field in dataclasses.fields(Config)}
 
 
 #Read input info
@@ -64,62 +152,159 @@ def generate_vertical_drifts_list(x):
             break
     return list
 
-#Write the input to config.json
-def out_put_config():
-    opt,args = getopt.getopt(sys.argv[1:],'-I:-L:-D:-V:-H:-T:-P:-O:-h',['help','low','no-fast','no-tag','stat'])
+#Convert an entry to the type of its field
+def convert_entry(name, value):
+    if name not in FIELD_TYPES :
+        raise ValueError("Unknown configuration entry: %s" % name)
+    field_type = FIELD_TYPES[name]
+    if name == 'Vertical_drift' :
+        # a drift radius, as given by -V, or the list of drifts
+        if isinstance(value, str) :
+            value = int(value)
+        if isinstance(value, int) :
+            return tuple(generate_vertical_drifts_list(value))
+        return tuple(int(v) for v in value)
+    if field_type is tuple :
+        # lists are given as "10,50,90" in the environment
+        if isinstance(value, str) :
+            value = [v for v in value.split(',') if v.strip()]
+        return tuple(int(v) for v in value)
+    if isinstance(value, str) and field_type is not str :
+        if field_type is bool :
+            if value.lower() not in ('1','true','yes','on','0','false','no','off','') :
+                raise ValueError("%s must be a boolean, got %r" % (name, value))
+            return value.lower() in ('1','true','yes','on')
+        return field_type(value)
+    if field_type is float and isinstance(value, int) and not isinstance(value, bool) :
+        return float(value)
+    if not isinstance(value, field_type) or (field_type is int and isinstance(value, bool)) :
+        raise ValueError("%s must be of type %s, got %r" % (name, field_type.__name__, value))
+    return value
+
+#Build a configuration from a dict of entries
+def make_config(entries):
+    return Config(**{name: convert_entry(name, value) for name, value in entries.items()})
+
+#Configuration of a library call
+def default_config(overrides=None):
+    """Default configuration updated with the given entries, without reading the command line.
+
+    Args:
+        overrides: dict,Configuration entries to change, see the
+            Customize Config section of the README.
+
+    Returns:
+        Returns a new Config.
+
+    Raises:
+        ValueError: An entry is not a configuration entry or has a value
+            of the wrong type.
+    """
+    return make_config(overrides or {})
+
+#Entries given by CLOVER_<ENTRY> environment variables
+def env_entries(environ):
+    return {name: environ[ENV_PREFIX + name.upper()] for name in FIELD_TYPES if ENV_PREFIX + name.upper() in environ}
+
+#Entries given by the command line options, and the --config file
+def argv_entries(argv):
+    entries = {}
+    config_path = None
+    opt,args = getopt.getopt(argv,SHORT_OPTS,LONG_OPTS)
 
     for opt_name,opt_value in opt :
-        if '-h' in opt_name or '--help' in opt_name:
+        if opt_name in ('-h', '--help') :
             print("Please see readme.md")
-        if '-I' in opt_name :
-            config_dict['input_path'] = opt_value
-        if '-L' in opt_name :
-            config_dict['read_len'] =int(opt_value)
-        if '-D' in opt_name :
-            config_dict['end_tree_len'] = int(opt_value)
-            if config_dict['same_tree_len'] == True :
-                config_dict['other_tree_len'] = int(opt_value)
-        if '-V' in opt_name :
-            config_dict['Vertical_drift'] = generate_vertical_drifts_list(int(opt_value))
-        if '-H' in opt_name :
-            config_dict['Horizontal_drift'] = int(opt_value)
-        if  '-T' in opt_name :
-            config_dict['tag_nums'] = int(opt_value)
-            config_dict['tag_mode'] = True
-        if '-P' in opt_name :
-            config_dict['processes_nums'] = int(opt_value)
-        if '-O' in opt_name :
-            config_dict['output_file'] = opt_value+'.txt'
-        if '--align' in opt_name:
-            config_dict['align_fuc'] = True 
-        if '--no-fast' in opt_name:
-            config_dict['fast_mode'] = False
-        if '--no-tag' in opt_name :
-            config_dict['Virtual_mode'] = False
-        if '--stat' in opt_name :
-            config_dict['Statistical_model'] = True
-        if '--low' in opt_name:
-            config_dict['mmr_mode'] = True
-            config_dict['fast_mode'] = False
-            config_dict['align_fuc'] = False
-            config_dict['Statistical_model'] = False
-            config_dict['Virtual_mode'] = False
-    if config_dict['read_len_min'] == 0 :
-        config_dict['read_len_min'] = config_dict['read_len'] - 5
-    if type(config_dict['Vertical_drift']) == int :
-        config_dict['Vertical_drift'] = generate_vertical_drifts_list(config_dict['Horizontal_drift']) 
-    config_dict['tag']="""
-      ___           ___       ___           ___           ___           ___     
-     /\  \         /\__\     /\  \         /\__\         /\  \         /\  \    
-    /::\  \       /:/  /    /::\  \       /:/  /        /::\  \       /::\  \   
-   /:/\:\  \     /:/  /    /:/\:\  \     /:/  /        /:/\:\  \     /:/\:\  \  
-  /:/  \:\  \   /:/  /    /:/  \:\  \   /:/__/  ___   /::\~\:\  \   /::\~\:\  \ 
- /:/__/ \:\__\ /:/__/    /:/__/ \:\__\  |:|  | /\__\ /:/\:\ \:\__\ /:/\:\ \:\__\\
- \:\  \  \/__/ \:\  \    \:\  \ /:/  /  |:|  |/:/  / \:\~\:\ \/__/ \/_|::\/:/  /
-  \:\  \        \:\  \    \:\  /:/  /   |:|__/:/  /   \:\ \:\__\      |:|::/  / 
-   \:\  \        \:\  \    \:\/:/  /     \::::/__/     \:\ \/__/      |:|\/__/  
-    \:\__\        \:\__\    \::/  /       ~~~~          \:\__\        |:|  |    
-     \/__/         \/__/     \/__/                       \/__/         \|__|    """
-    return config_dict
+        if opt_name == '-I' :
+            entries['input_path'] = opt_value
+        if opt_name == '-L' :
+            entries['read_len'] =int(opt_value)
+        if opt_name == '-D' :
+            entries['end_tree_len'] = int(opt_value)
+        if opt_name == '-V' :
+            entries['Vertical_drift'] = int(opt_value)
+        if opt_name == '-H' :
+            entries['Horizontal_drift'] = int(opt_value)
+        if opt_name == '-T' :
+            entries['tag_nums'] = int(opt_value)
+            entries['tag_mode'] = True
+        if opt_name == '-P' :
+            entries['processes_nums'] = int(opt_value)
+        if opt_name == '-j' :
+            entries['jobs'] = int(opt_value)
+            entries['pool_mode'] = True
+        if opt_name == '--buckets' :
+            entries['partition_buckets'] = int(opt_value)
+            entries['pool_mode'] = True
+        if opt_name == '-O' :
+            entries['output_file'] = opt_value+'.txt'
+        if opt_name == '--output-format' :
+            entries['output_format'] = opt_value
+        if opt_name == '--align' :
+            entries['align_fuc'] = True 
+        if opt_name == '--no-fast' :
+            entries['fast_mode'] = False
+        if opt_name == '--no-tag' :
+            entries['Virtual_mode'] = False
+        if opt_name == '--stat' :
+            entries['Statistical_model'] = True
+        if opt_name == '--mmap' :
+            entries['mmap_mode'] = True
+        if opt_name == '--profile' :
+            entries['profile_mode'] = True
+        if opt_name == '--checkpoint' :
+            entries['checkpoint_dir'] = opt_value
+        if opt_name == '--resume' :
+            entries['resume_mode'] = True
+        if opt_name == '--state' :
+            entries['state_dir'] = opt_value
+        if opt_name == '--config' :
+            config_path = opt_value
+        if opt_name == '--sketch' :
+            entries['sketch_nums'] = int(opt_value)
+        if opt_name == '--fragment-len' :
+            entries['fragment_len'] = int(opt_value)
+        if opt_name == '--window' :
+            entries['sketch_window'] = int(opt_value)
+        if opt_name == '--match' :
+            entries['match_nums'] = int(opt_value)
+        if opt_name == '--drift' :
+            entries['drift_mode'] = True
+        if opt_name == '--verify' :
+            entries['verify_mode'] = True
+        if opt_name == '--verify-distance' :
+            entries['verify_distance'] = int(opt_value)
+            entries['verify_mode'] = True
+        if opt_name == '--verify-jobs' :
+            entries['verify_jobs'] = int(opt_value)
+        if opt_name == '--merge' :
+            entries['merge_mode'] = True
+        if opt_name == '--low' :
+            entries['mmr_mode'] = True
+            entries['fast_mode'] = False
+            entries['align_fuc'] = False
+            entries['Statistical_model'] = False
+            entries['Virtual_mode'] = False
+    return entries, config_path
+
+#Configuration of a command line run
+def out_put_config(argv=None, environ=None):
+    """Configuration of a run from its JSON file, environment and command line options.
 
+    Args:
+        argv: list,Command line options, sys.argv[1:] if None.
+        environ: dict,Environment variables, os.environ if None.
 
+    Returns:
+        Returns a new Config.
+    """
+    cli_entries, config_path = argv_entries(sys.argv[1:] if argv is None else argv)
+    entries = {}
+    if config_path :
+        entries.update(load_json(config_path))
+    entries.update(env_entries(os.environ if environ is None else environ))
+    entries.update(cli_entries)
+    # -D sets the depth of the other trees too with same_tree_len
+    if 'end_tree_len' in cli_entries and convert_entry('same_tree_len', entries.get('same_tree_len', True)) :
+        entries['other_tree_len'] = cli_entries['end_tree_len']
+    return make_config(entries)
@@ -1,50 +1,64 @@
-from collections import Counter
-from multiprocessing import Process, Queue
+from multiprocessing import Pool, Process, Queue
+import dataclasses
+import itertools
+import json
 import os
+import shutil
+import tempfile
 import time
+import numpy as np
 from tqdm import tqdm
+from clover import checkpoint as cp
+from clover import evaluate as ev
+from clover import hashing as hs
+from clover import index as ix
 from clover import load_config as lc
+from clover import merge as mg
+from clover import output as op
+from clover import profiler as pf
+from clover import reader as rd
+from clover import store as rs
+from clover import table as tb
+from clover import transport as tp
+from clover import verify as vr
 #clover/align module for global alignment not imported
 
 class MyProcess(Process):
     """Process Class for Clover using DUHI's concept"""
 
-    def __init__(self, name, data, q_output):
+    def __init__(self, name, data, q_output, config=None):
         Process.__init__(self)
-        self.config_dict = lc.out_put_config()
+        self.config = lc.Config() if config is None else config
         self.name = name
         self.data = data
         self.q_output = q_output
         self.q_output_temp = []
-        self.Cluster_size_threshold = self.config_dict['Cluster_size_threshold'] #unused
+        self.Cluster_size_threshold = self.config.Cluster_size_threshold #unused
         self.ref_list = {}
         self.ref_dict = {}
         self.ref_error_dict = {}
         self.num_dict = {}
-        self.tag_dict = {}
         self.index_list = []
-        self.now_clust_threshold = self.config_dict['now_clust_threshold']
-        self.read_len = self.config_dict['read_len']
-        #self.dna_tree_nums = self.config_dict['end_tree_len']
-        #self.fuzz_list = [self.config_dict['thd_tree_loc'], self.config_dict['four_tree_loc'], self.config_dict['other_tree_len']]
-        self.loc_nums = self.config_dict['Vertical_drift']
-        self.tag_nums = self.config_dict['tag_nums']
-        self.align_swicth = self.config_dict['align_fuc']
-        #self.fuzz_tree_nums = self.config_dict['Horizontal_drift']
-        self.h_index = self.config_dict['h_index_nums'] #unused
-        self.e_index = self.config_dict['e_index_nums'] #unused
+        self.now_clust_threshold = self.config.now_clust_threshold
+        self.read_len = self.config.read_len
+        self.rep_interval = self.config.rep_update_interval
+        #self.dna_tree_nums = self.config.end_tree_len
+        #self.fuzz_list = [self.config.thd_tree_loc, self.config.four_tree_loc, self.config.other_tree_len]
+        self.loc_nums = self.config.Vertical_drift
+        self.tag_nums = self.config.tag_nums
+        self.align_swicth = self.config.align_fuc
+        #self.fuzz_tree_nums = self.config.Horizontal_drift
+        self.h_index = self.config.h_index_nums #unused
+        self.e_index = self.config.e_index_nums #unused
         self.test_num = 0
         self.file_format = "txt"
+        self.input_done = False
 
-        # Current implementation only uses .txt input format
-        if 'input_path' in self.config_dict: 
-            if self.config_dict['input_path'][-1] == "a":
-                self.file_format = "fasta"
-            elif self.config_dict['input_path'][-1] == "q":
-                self.file_format = "fastq"
+        if self.config.input_path: 
+            self.file_format = rd.detect_format(self.config.input_path)
 
         # Threshold for inter-cluster distance based on DUHI hash formula - in config file
-        #self.cluster_hash_threshold = self.config_dict['Cluster_hash_threshold']
+        #self.cluster_hash_threshold = self.config.Cluster_hash_threshold
         # Initialize arrays for storing cluster hash values
 
         # self.front_hash_array = {}
@@ -54,19 +68,49 @@ class MyProcess(Process):
         # self.middle_ref_list = {}
         # self.back_ref_list = {}
 
-        # Initialize dictionaries for fragment cluster information
-        self.front_hash_dict = {}
-        self.middle_hash_dict = {}
-        self.back_hash_dict = {}
-        self.saved_clusters = {} # stores cluster data by dna indexes
-        self.cluster_data = {} # stores histogram of hash values for each cluster
+        # Sketch of a read: fragments at sketch_offsets, match_nums of which must match a cluster
+        self.fragment_len = self.config.fragment_len
+        self.sketch_offsets = self.config.sketch_offsets
+        self.sketch_window = self.config.sketch_window
+        self.match_groups = ix.match_groups(len(self.sketch_offsets), self.config.match_nums)
+        self.match_nums = self.config.match_nums
+        if self.match_nums != 2 or len(self.sketch_offsets) > 3:
+            # larger sketches count the cluster ids of the buckets rather than walk the fragment pairs
+            self.match = self.match_any
+        # With --drift, fragments are also looked up shifted by the Vertical_drift offsets, nearest first
+        self.drifts = None
+        if self.config.drift_mode:
+            self.drifts = tuple(sorted(set(self.loc_nums) | {0}, key=lambda drift: (abs(drift), drift)))
+            self.drift_nums = min(self.match_nums + 1, len(self.sketch_offsets))
+
+        # Initialize indexes for fragment cluster information, one per sketch fragment
+        self.indexes = [ix.FragmentIndex(self.fragment_len) for _ in self.sketch_offsets]
+        self.cluster_table = tb.ClusterTable(len(self.sketch_offsets)) # stores sizes, representatives and hash value histograms of clusters
+        self.read_tags = [] # tag of each clustered read, in cluster_table.read_cluster order
+        self.read_seqs = [] if self.config.verify_mode else None # sequence of each clustered read, kept for --verify
+
+        # Snapshots of the process state for --resume, see save_checkpoint
+        self.checkpoint_dir = self.config.checkpoint_dir
+        self.checkpoint_interval = self.config.checkpoint_interval
+        self.consumed = 0 # number of input reads of the process already clustered
+        self.last_checkpoint = time.time()
+        # Clustering state kept between runs with --state, see restore_state
+        self.state_dir = self.config.state_dir
+        self.first_read = 0 # reads before it were clustered by earlier runs and are not reported
+
+        # With --profile the per-read methods are swapped for counting and timing ones
+        self.profiler = pf.make_profiler(self.config.profile_mode)
+        self.first_common = ix.first_common
+        if self.drifts is not None:
+            self.assign = self.assign_drift
+        if self.profiler.enabled:
+            self.assign = self.assign_profiled
+            self.first_common = self.count_intersection
 
     
     def hash_value(self, fragment):
         """DUHI's hash formula for DNA fragment."""
-        base_val = {'A': 1, 'T': 2, 'G': 3, 'C': 4}
-        hash_val = sum((2 ** (7 - i)) * base_val[char] for i, char in enumerate(fragment))
-        return hash_val
+        return hs.hash_value(fragment)
 
     def extract_fragments(self, dna_str):
         """Extract the middle-front, middle, and middle-back fragments of the DNA strand."""
@@ -110,7 +154,7 @@ class MyProcess(Process):
         line_ = read.split()
         
         dna_num = self.test_num
-        if self.config_dict['Virtual_mode'] == False or self.config_dict['mmr_mode'] == True:
+        if self.config.Virtual_mode == False or self.config.mmr_mode == True:
             dna_index = line_[0]
             dna_str = line_[1]
             dna_tag = line_[0]
@@ -118,247 +162,401 @@ class MyProcess(Process):
             dna_str = line_[1]
             dna_tag = line_[0]
         #h_index, e_index for dna primer not implemented, assumed 0
-        if len(dna_str) < self.config_dict['read_len_min'] or "N" in dna_str:
+        if len(dna_str) < self.config.read_len_min or "N" in dna_str:
             return
         
-        front, middle, back = self.extract_fragments(dna_str)
-        front_hash = self.hash_value(front)
-        middle_hash = self.hash_value(middle)
-        back_hash = self.hash_value(back)
-
-        # if self.front_hash_array == []:
-        #     self.front_hash_array[dna_num] = (front_hash, 1)
-        #     self.middle_hash_array[dna_num] = (middle_hash, 1)
-        #     self.back_hash_array[dna_num] = (back_hash, 1)
-        #     #self.ref_list[dna_num] = dna_str
-        #     self.front_ref_list[dna_num] = {front_hash: 1}
-        #     self.middle_ref_list[dna_num] = {middle_hash: 1}
-        #     self.back_ref_list[dna_num] = {back_hash: 1}
-        #     self.saved_clusters[dna_num] = [dna_tag]
-        #     return
-        
-        # match_found = False
-        # i = 0
-        # cluster_num = len(self.front_hash_array)
-        # for idx in self.front_hash_array:
-        #     count = 0
-        #     front_cluster = self.front_hash_array[idx][0]
-        #     middle_cluster = self.middle_hash_array[idx][0]
-        #     back_cluster = self.back_hash_array[idx][0]
-        #     if front_hash <= front_cluster + self.cluster_hash_threshold and front_hash >= front_cluster - self.cluster_hash_threshold:
-        #         count += 1
-        #     if middle_hash <= middle_cluster + self.cluster_hash_threshold and middle_hash >= middle_cluster - self.cluster_hash_threshold:
-        #         count += 1
-        #     if back_hash <= back_cluster + self.cluster_hash_threshold and back_hash >= back_cluster - self.cluster_hash_threshold:
-        #         count += 1
-            
-        #     if count >= 2: # cluster matches if at least 2 fragments meet cluster threshold
-        #         match_found = True
-        #         i = idx
-        #         break
-
-        # if match_found:
-        #     # update fragments cluster count
-        #     self.front_hash_array[i][1] += 1
-        #     self.middle_hash_array[i][1] += 1
-        #     self.back_hash_array[i][1] += 1
-
-        #     # update fragments cluster hash values count
-        #     if front_hash in self.front_ref_list[i]:
-        #         self.front_ref_list[i][front_hash] += 1
-        #     else:
-        #         self.front_ref_list[i][front_hash] = 1
-        #     if middle_hash in self.middle_ref_list[i]:
-        #         self.middle_ref_list[i][middle_hash] += 1
-        #     else:
-        #         self.middle_ref_list[i][middle_hash] = 1
-        #     if back_hash in self.back_ref_list[i]:
-        #         self.back_ref_list[i][back_hash] += 1
-        #     else:
-        #         self.back_ref_list[i][back_hash] = 1
-
-        #     # update fragment cluster representative hash value if size / 5 = 0
-        #     if self.front_hash_array[i][1] == 5:
-        #         self.update_hash(i, "front")
-        #     if self.middle_hash_array[i][1] == 5:
-        #         self.update_hash(i, "middle")
-        #     if self.back_hash_array[i][1] == 5:
-        #         self.update_hash(i, "back")
-
-        #     self.saved_clusters[i].append(dna_tag)
-
-        # else: # if no matches found, create new cluster for all fragments
-        #     self.front_hash_array[dna_num] = (front_hash, 1)
-        #     self.middle_hash_array[dna_num] = (middle_hash, 1)
-        #     self.back_hash_array[dna_num] = (back_hash, 1)
-        #     #self.ref_list[dna_num] = dna_str
-        #     self.front_ref_list[dna_num] = {front_hash: 1}
-        #     self.middle_ref_list[dna_num] = {middle_hash: 1}
-        #     self.back_ref_list[dna_num] = {back_hash: 1}
-        #     self.saved_clusters[dna_num] = [dna_tag]
-
-        # Clustering logic using hash arrays
-        match_found = []
-        if front_hash in self.front_hash_dict:
-            if middle_hash in self.middle_hash_dict:
-                match_found = list(set(self.front_hash_dict[front_hash]) & set(self.middle_hash_dict[middle_hash]))
-                if match_found == []:
-                    if back_hash in self.back_hash_dict:
-                        match_found = list(set(self.front_hash_dict[front_hash]) & set(self.back_hash_dict[back_hash]))
-                        if match_found == []:
-                            match_found = list(set(self.middle_hash_dict[middle_hash]) & set(self.back_hash_dict[back_hash]))
-            else: 
-                if back_hash in self.back_hash_dict:
-                    match_found = list(set(self.front_hash_dict[front_hash]) & set(self.back_hash_dict[back_hash]))
+        if self.read_seqs is not None:
+            self.read_seqs.append(dna_str)
+        self.assign(dna_tag, self.hash_reads([dna_str])[0].tolist())
+
+    def hash_reads(self, seqs):
+        """Sketch hashes of a list of reads as a (reads, fragments) matrix."""
+        return hs.batch_hash(seqs, self.read_len, self.fragment_len, self.sketch_offsets, self.sketch_window, self.drifts)
+
+    def cluster_batch(self, records):
+        """Cluster a chunk of (tag, read) records with batch fragment hashing.
+
+        Fragment hashes of the whole chunk are computed at once by
+        hashing.batch_hash, then each read is assigned in input order
+        exactly as cluster() would do.
+        """
+        if isinstance(records, rs.PackedReads):
+            self.cluster_packed(records)
+            return
+        read_len_min = self.config.read_len_min
+        keep = [i for i, record in enumerate(records)
+                if len(record[1]) >= read_len_min and "N" not in record[1]]
+        self.profiler.count("reads_parsed", len(records))
+        self.profiler.count("reads_filtered", len(records) - len(keep))
+        if keep:
+            seqs = [records[i][1] for i in keep]
+            if self.read_seqs is not None:
+                self.read_seqs.extend(seqs)
+            with self.profiler.timer("hash"):
+                hashes = self.hash_reads(seqs).tolist()
+            for i, read_hashes in zip(keep, hashes):
+                self.assign(records[i][0], read_hashes)
+        self.test_num += len(records)
+
+    def cluster_packed(self, reads):
+        """Cluster the reads of a PackedReads store.
+
+        The base matrix used for hashing is unpacked directly from the 2-bit
+        codes, reads of a store never contain N.
+        """
+        keep = np.flatnonzero(reads.lengths() >= self.config.read_len_min)
+        self.profiler.count("reads_parsed", len(reads))
+        self.profiler.count("reads_filtered", len(reads) - len(keep))
+        if len(keep):
+            tags = reads.tags()
+            if self.read_seqs is not None:
+                self.read_seqs.extend(reads.seq(i) for i in keep.tolist())
+            with self.profiler.timer("hash"):
+                hashes = hs.hash_packed(reads, self.read_len, self.fragment_len, self.sketch_offsets,
+                                        self.sketch_window, self.drifts)[keep]
+            self.assign_batch([tags[i] for i in keep.tolist()], hashes)
+        self.test_num += len(reads)
+
+    def assign_batch(self, tags, hashes):
+        """Assign reads in order given their tags and (reads, fragments) sketch hash matrix."""
+        assign = self.assign
+        for tag, read_hashes in zip(tags, hashes.tolist()):
+            assign(tag, read_hashes)
+
+    def cluster_mapped(self, start, end):
+        """Cluster the reads of a byte range of the memory-mapped input file.
+
+        Records are located and hashed directly on the mapped bytes, only
+        the tag of a kept read is decoded. The process name is used as the
+        partition prefix, as in the driver.
+        """
+        buf = rd.map_input(self.config.input_path)
+        if buf is None:
+            return
+        prefix = b"" if self.name == "all" else self.name.encode()
+        read_len_min = self.config.read_len_min
+        for view, tag_starts, seq_starts, seq_lens in rd.scan_mapped(buf, start, end, prefix):
+            read_nums = len(seq_lens)
+            valid = seq_lens >= read_len_min
+            tag_starts, seq_starts, seq_lens = tag_starts[valid], seq_starts[valid], seq_lens[valid]
+            self.profiler.count("reads_parsed", read_nums)
+            self.profiler.count("reads_filtered", read_nums - len(seq_lens))
+            with self.profiler.timer("hash"):
+                hashes = hs.hash_buffer(view, seq_starts, seq_lens, self.read_len, self.fragment_len,
+                                        self.sketch_offsets, self.sketch_window, self.drifts).tolist()
+            if self.read_seqs is not None:
+                self.read_seqs.extend(view[seq_start:seq_start + seq_len].tobytes().decode()
+                                      for seq_start, seq_len in zip(seq_starts.tolist(), seq_lens.tolist()))
+            tag_ends = (seq_starts - 1).tolist()
+            for tag_start, tag_end, read_hashes in zip(tag_starts.tolist(), tag_ends, hashes):
+                self.assign(view[tag_start:tag_end].tobytes().decode(), read_hashes)
+            self.test_num += read_nums
+
+    def assign(self, dna_tag, hashes):
+        """Assign a read to a matching cluster or open a new one given its sketch hashes."""
+        self.update(dna_tag, hashes, self.match(hashes))
+
+    def assign_profiled(self, dna_tag, hashes):
+        """assign() timing the index lookups and the cluster updates, used with --profile.
+
+        With --drift, hashes are the (fragments, drifts) hashes of the read,
+        see assign_drift.
+        """
+        start = time.perf_counter()
+        if self.drifts is None:
+            idx = self.match(hashes)
         else:
-            if middle_hash in self.middle_hash_dict and back_hash in self.back_hash_dict:
-                    match_found = list(set(self.middle_hash_dict[middle_hash]) & set(self.back_hash_dict[back_hash]))
-
-        # Maintain fragment clusters after matching
-        if match_found == []:
-            self.saved_clusters[dna_num] = []
-            self.saved_clusters[dna_num].append(dna_tag)
-
-            self.cluster_data[dna_num] = {"front": {front_hash: 1}, "middle": {middle_hash: 1}, "back": {back_hash: 1}, "current": [front_hash, middle_hash, back_hash]}
-            if front_hash in self.front_hash_dict:
-                self.front_hash_dict[front_hash].append(dna_num)
-            else:
-                self.front_hash_dict[front_hash] = [dna_num]
-
-            if middle_hash in self.middle_hash_dict:
-                self.middle_hash_dict[middle_hash].append(dna_num)
-            else:
-                self.middle_hash_dict[middle_hash] = [dna_num]
-
-            if back_hash in self.back_hash_dict:
-                self.back_hash_dict[back_hash].append(dna_num)
-            else:
-                self.back_hash_dict[back_hash] = [dna_num]
+            hashes, idx = self.match_drifted(hashes)
+        matched = time.perf_counter()
+        self.update(dna_tag, hashes, idx)
+        self.profiler.add_time("index_lookup", matched - start)
+        self.profiler.add_time("cluster_update", time.perf_counter() - matched)
+        self.profiler.count("new_clusters" if idx is None else "joins")
+
+    def assign_drift(self, dna_tag, drift_hashes):
+        """assign() given the (fragments, drifts) hashes of a read, used with --drift.
+
+        The unshifted fragments are matched first, the shifted ones only when
+        they do not match any cluster. The read is always added with its
+        unshifted hashes.
+        """
+        self.update(dna_tag, *self.match_drifted(drift_hashes))
+
+    def match_drifted(self, drift_hashes):
+        """Unshifted hashes of a read and the id of the cluster it matches, see assign_drift."""
+        hashes = [fragment_hashes[0] for fragment_hashes in drift_hashes]
+        idx = self.match(hashes)
+        if idx is None:
+            idx = self.match_drift(drift_hashes)
+            if idx is not None:
+                self.profiler.count("drift_joins")
+        return hashes, idx
+
+    def count_intersection(self, bucket_a, bucket_b):
+        """ix.first_common counting the bucket intersections, used with --profile."""
+        self.profiler.count("intersections")
+        return ix.first_common(bucket_a, bucket_b)
+
+    def match(self, hashes):
+        """Id of a cluster matching 2 of the sketch hashes of a read, None if there is none."""
+        # Clustering logic using the fragment indexes, pairs of fragments are checked in match_groups order
+        first_common = self.first_common
+        buckets = [index.get(hash_val) for index, hash_val in zip(self.indexes, hashes)]
+        for a, b in self.match_groups:
+            bucket_a = buckets[a]
+            if bucket_a:
+                bucket_b = buckets[b]
+                if bucket_b:
+                    idx = first_common(bucket_a, bucket_b)
+                    if idx is not None:
+                        return idx
+        return None
+
+    def match_any(self, hashes):
+        """match() for any number of sketch fragments, match_nums of which must match."""
+        return ix.first_shared([index.get(hash_val) for index, hash_val in zip(self.indexes, hashes)], self.match_nums)
+
+    def match_drift(self, drift_hashes):
+        """Id of a cluster matching the sketch of a read with all its fragments shifted by the same drift.
+
+        An indel before a fragment shifts it and every following fragment by
+        the same number of bases, so the shifts are tried one at a time,
+        nearest first, rather than mixed between fragments. Each shift is
+        another chance of a DUHI hash collision, so a shifted sketch has to
+        match one more fragment than match_nums.
+        """
+        for k in range(1, len(self.drifts)):
+            buckets = [index.get(fragment_hashes[k]) if fragment_hashes[k] >= 0 else None
+                       for index, fragment_hashes in zip(self.indexes, drift_hashes)]
+            idx = ix.first_shared(buckets, self.drift_nums)
+            if idx is not None:
+                return idx
+        return None
+
+    def update(self, dna_tag, hashes, idx):
+        """Add a read to the cluster idx, or to a new cluster if idx is None, and maintain the indexes."""
+        self.read_tags.append(dna_tag)
+        if idx is None:
+            idx = self.cluster_table.new_cluster(hashes)
+            self.cluster_table.add_read(idx, hashes)
+            for index, hash_val in zip(self.indexes, hashes):
+                index.add(hash_val, idx)
+        # update fragment cluster representative hash value every rep_interval strands
+        elif self.cluster_table.add_read(idx, hashes) % self.rep_interval == 0:
+            current = self.cluster_table.current
+            for f, index in enumerate(self.indexes):
+                best = self.cluster_table.most_common(idx, f)
+                if best != current[f][idx]:
+                    index.move(current[f][idx], best, idx)
+                    current[f][idx] = best
+                    self.profiler.count("representative_swaps")
+
+    def cluster_tags(self, start=0):
+        """Tags of the reads of each cluster from read number start on, in cluster creation order."""
+        read_tags = self.read_tags
+        return [[read_tags[i] for i in reads] for reads in self.cluster_table.members(start)]
+
+    def iter_chunks(self):
+        """Yield the fast mode input chunk by chunk.
+
+        self.data is either a list of input lines, yielded as chunks of
+        (tag, read) records, a queue fed by the driver with PackedReads
+        chunks and closed by a None sentinel, or the path of a spill file
+        of PackedReads chunks written by spill_buckets.
+        """
+        if isinstance(self.data, str):
+            yield from self.profiler.timed_iter(rs.iter_spill(self.data), "spill_read")
+        elif hasattr(self.data, "get"):
+            while True:
+                with self.profiler.timer("queue_wait"):
+                    chunk = self.data.get()
+                if chunk is None:
+                    self.input_done = True
+                    break
+                yield chunk
         else:
-            idx = match_found[0]
-            self.saved_clusters[idx].append(dna_tag)
-            if front_hash in self.cluster_data[idx]["front"]:
-                self.cluster_data[idx]["front"][front_hash] += 1
-            else:
-                self.cluster_data[idx]["front"][front_hash] = 1
-            
-            if middle_hash in self.cluster_data[idx]["middle"]:
-                self.cluster_data[idx]["middle"][middle_hash] += 1
-            else:
-                self.cluster_data[idx]["middle"][middle_hash] = 1
-            
-            if back_hash in self.cluster_data[idx]["back"]:
-                self.cluster_data[idx]["back"][back_hash] += 1
-            else:
-                self.cluster_data[idx]["back"][back_hash] = 1
-
-            # update fragment cluster representative hash value every 5 strands
-            if len(self.saved_clusters[idx])%5 == 0:
-                front_max = max(zip(self.cluster_data[idx]["front"].values(), self.cluster_data[idx]["front"].keys()))[1]
-                middle_max = max(zip(self.cluster_data[idx]["middle"].values(), self.cluster_data[idx]["middle"].keys()))[1]
-                back_max = max(zip(self.cluster_data[idx]["back"].values(), self.cluster_data[idx]["back"].keys()))[1]
-
-                if front_max != self.cluster_data[idx]["current"][0]:
-                    self.front_hash_dict[self.cluster_data[idx]["current"][0]].remove(idx)
-                    if front_max in self.front_hash_dict:
-                        self.front_hash_dict[front_max].append(idx)
-                    else:
-                        self.front_hash_dict[front_max] = [idx]
-                    self.cluster_data[idx]["current"][0] = front_max
-                    
-                if middle_max != self.cluster_data[idx]["current"][1]:
-                    self.middle_hash_dict[self.cluster_data[idx]["current"][1]].remove(idx)
-                    if middle_max in self.middle_hash_dict:
-                        self.middle_hash_dict[middle_max].append(idx)
-                    else:
-                        self.middle_hash_dict[middle_max] = [idx]
-                    self.cluster_data[idx]["current"][1] = middle_max
-
-                if back_max != self.cluster_data[idx]["current"][2]:
-                    self.back_hash_dict[self.cluster_data[idx]["current"][2]].remove(idx)
-                    if back_max in self.back_hash_dict:
-                        self.back_hash_dict[back_max].append(idx)
-                    else:
-                        self.back_hash_dict[back_max] = [idx]
-                    self.cluster_data[idx]["current"][2] = back_max
-        
-        # print(self.saved_clusters)
-        
+            batch_size = self.config.batch_size
+            for i in tqdm(range(0, len(self.data), batch_size)):
+                yield [line.split() for line in self.data[i:i + batch_size]]
 
     def run(self):
-        self.num_dict[self.name + "sum_read_num"] = 0
-        self.num_dict[self.name + "error_num"] = 0
-        self.num_dict[self.name + "sum_cluster_num"] = 0
-        self.num_dict[self.name + "sum_tag"] = []
-
-        if self.config_dict['fast_mode']:
-            for line in tqdm(self.data):
-                self.cluster(line)
-            if 'output_file' in self.config_dict:
-                for i in self.saved_clusters:
-                    self.index_list.append(self.saved_clusters[i])
-                # print(self.index_list)
-                self.num_dict[self.name + "index_list"] = self.index_list
-                # self.num_dict[self.name + "saved_clusters"] = self.saved_clusters
-
-            if self.config_dict['Virtual_mode']:
-                tag_sum = 0
-                tag_error = 0
-                nums_ = 0
-                nums_sum = 0
-                for key in self.saved_clusters:
-                    tag_len = len(self.saved_clusters[key])
-                    if tag_len > self.Cluster_size_threshold:
-                        nums_sum += 1
-                        tag_c = Counter(self.saved_clusters[key]).most_common(1)[0][1]
-                        tag_error += tag_len - tag_c
-                        tag_sum += tag_len
-                        tag = self.saved_clusters[key][0]
-                        if tag not in self.tag_dict:
-                            nums_ += 1
-                            self.tag_dict[tag] = 1
-                    self.saved_clusters[key] = []
-
-                self.num_dict[self.name + "sum_read_num"] += tag_sum
-                self.num_dict[self.name + "error_num"] += tag_error
-                self.num_dict[self.name + "sum_cluster_num"] = nums_sum
-                for key in self.tag_dict:
-                    self.num_dict[self.name + "sum_tag"].append(key)
+        try:
+            results = self.ship()
+        except Exception as error:
+            # the driver waits for a result of every process, send it the error instead
+            self.q_output.put(tp.failure(self.name, error))
+            self.drain_input()
+            raise
+        self.q_output.put(results)
+
+    def drain_input(self):
+        """Consume the rest of a queue input, so the driver feeding it is not blocked."""
+        if hasattr(self.data, "get") and not self.input_done:
+            while self.data.get() is not None:
+                pass
+            self.input_done = True
+
+    def ship(self):
+        """Cluster the input and return the results to send to the main process.
+
+        Arrays and tag lists go through shared memory, only metadata and,
+        with --profile, the profiler report through the queue.
+        """
+        num_dict = self.cluster_input()
+        if self.state_dir:
+            self.save_state(cp.snapshot_path(self.state_dir, self.name))
+        with self.profiler.timer("publish"):
+            results = tp.publish(num_dict)
+        if self.profiler.enabled:
+            results[self.name + "profile"] = self.profiler.report()
+        return results
+
+    def cluster_input(self):
+        """Cluster the whole input of the process and return its num_dict."""
+        if self.state_dir:
+            self.restore_state(cp.snapshot_path(self.state_dir, self.name))
+        if self.config.resume_mode and self.checkpoint_dir:
+            self.restore_checkpoint()
+        if self.config.fast_mode:
+            if isinstance(self.data, tuple):
+                self.cluster_mapped(*self.data)
+            else:
+                for chunk in self.resume_chunks(self.iter_chunks()):
+                    self.cluster_batch(chunk)
+            with self.profiler.timer("report"):
+                self.report()
         else:
-            if self.config_dict['Virtual_mode']:
-                f = open(self.config_dict['input_path'], "r")
-                while True:
-                    line = f.readline()
-                    if line == [] or line == "":
-                        break
-                    self.cluster(line)
-
-                if 'output_file' in self.config_dict:
-                    self.num_dict[self.name + "index_list"] = self.index_list
-
-                tag_sum = 0
-                tag_error = 0
-                nums_ = 0
-                nums_sum = 0
-                for key in self.saved_clusters:
-                    tag_len = len(self.saved_clusters[key])
-                    if tag_len > self.Cluster_size_threshold:
-                        nums_sum += 1
-                        tag_c = Counter(self.saved_clusters[key]).most_common(1)[0][1]
-                        tag_error += tag_len - tag_c
-                        tag_sum += tag_len
-                        tag = self.saved_clusters[key][0]
-                        if tag not in self.tag_dict:
-                            nums_ += 1
-                            self.tag_dict[tag] = 1
-                    self.saved_clusters[key] = []
-
-                self.num_dict[self.name + "sum_read_num"] += tag_sum
-                self.num_dict[self.name + "error_num"] += tag_error
-                self.num_dict[self.name + "sum_cluster_num"] = nums_sum
-                for key in self.tag_dict:
-                    self.num_dict[self.name + "sum_tag"].append(key)
-        self.q_output.put(self.num_dict)
+            if self.config.Virtual_mode:
+                chunks = rd.read_chunks(self.config.input_path, self.config.batch_size,
+                                        file_format=self.file_format)
+                for chunk in self.resume_chunks(self.profiler.timed_iter(chunks, "parse")):
+                    self.cluster_batch(chunk)
+                with self.profiler.timer("report"):
+                    self.report()
+        return self.num_dict
+
+    def resume_chunks(self, chunks):
+        """Yield the chunks of the input that are left to cluster and checkpoint periodically.
+
+        The first self.consumed reads, clustered before the snapshot the
+        process was restored from, are skipped. After a chunk has been
+        clustered, a snapshot is saved if checkpoint_interval seconds have
+        passed since the last one.
+        """
+        skip = self.consumed
+        for chunk in chunks:
+            if skip >= len(chunk):
+                skip -= len(chunk)
+                continue
+            if skip:
+                chunk = chunk.take(np.arange(skip, len(chunk))) if isinstance(chunk, rs.PackedReads) else chunk[skip:]
+                skip = 0
+            yield chunk
+            self.consumed += len(chunk)
+            if self.checkpoint_dir and time.time() - self.last_checkpoint >= self.checkpoint_interval:
+                self.save_checkpoint()
+
+    def state_arrays(self):
+        """Clustering state of the process as a dict of arrays, see load_arrays."""
+        arrays = {"table_" + key: value for key, value in self.cluster_table.to_arrays().items()}
+        for f, index in enumerate(self.indexes):
+            arrays["index_hashes%d" % f], arrays["index_ids%d" % f] = index.to_arrays()
+        tag_data, arrays["tag_offsets"] = rs.encode_tags(self.read_tags)
+        arrays["tag_data"] = np.frombuffer(tag_data, dtype=np.uint8)
+        if self.read_seqs is not None:
+            seq_data, arrays["seq_offsets"] = rs.encode_tags(self.read_seqs)
+            arrays["seq_data"] = np.frombuffer(seq_data, dtype=np.uint8)
+        arrays["counts"] = np.array([self.consumed, self.test_num, self.read_len, self.first_read], dtype=np.int64)
+        arrays["sketch"] = np.array([self.fragment_len, self.sketch_window, self.config.match_nums] + list(self.sketch_offsets), dtype=np.int64)
+        return arrays
+
+    def load_arrays(self, arrays):
+        """Replace the clustering state of the process by one saved by state_arrays."""
+        self.consumed, self.test_num, read_len, self.first_read = arrays["counts"].tolist()
+        if read_len != self.read_len:
+            raise ValueError("Snapshot of %s was made with read length %d" % (self.name, read_len))
+        if arrays["sketch"].tolist() != [self.fragment_len, self.sketch_window, self.config.match_nums] + list(self.sketch_offsets):
+            raise ValueError("Snapshot of %s was made with other sketch settings" % self.name)
+        self.cluster_table = tb.ClusterTable.from_arrays(
+            {key[len("table_"):]: value for key, value in arrays.items() if key.startswith("table_")})
+        self.indexes = [ix.FragmentIndex.from_arrays(arrays["index_hashes%d" % f], arrays["index_ids%d" % f], self.fragment_len)
+                        for f in range(len(self.indexes))]
+        self.read_tags = rs.decode_tags(arrays["tag_data"].tobytes(), arrays["tag_offsets"])
+        if self.read_seqs is not None:
+            if "seq_data" not in arrays:
+                raise ValueError("Snapshot of %s was made without the read sequences of --verify" % self.name)
+            self.read_seqs = rs.decode_tags(arrays["seq_data"].tobytes(), arrays["seq_offsets"])
+
+    def save_checkpoint(self):
+        """Save a snapshot of the clustering state of the process."""
+        with self.profiler.timer("checkpoint"):
+            cp.save(cp.snapshot_path(self.checkpoint_dir, self.name), self.state_arrays())
+        self.last_checkpoint = time.time()
+
+    def restore_checkpoint(self):
+        """Restore the state of the process from its snapshot, if there is one."""
+        arrays = cp.load(cp.snapshot_path(self.checkpoint_dir, self.name))
+        if arrays is not None:
+            self.load_arrays(arrays)
+
+    def save_state(self, path):
+        """Save the clustering state of the process for a later run to add reads to."""
+        with self.profiler.timer("state"):
+            first_read, consumed = self.first_read, self.consumed
+            # the next run starts a new input and reports its reads only
+            self.first_read, self.consumed = len(self.read_tags), 0
+            cp.save(path, self.state_arrays())
+            self.first_read, self.consumed = first_read, consumed
+
+    def restore_state(self, path):
+        """Restore the clustering state saved by an earlier run, if there is one.
+
+        The reads of the input are then added to the existing clusters,
+        which keep their ids, and only these reads are reported.
+        """
+        arrays = cp.load(path)
+        if arrays is not None:
+            with self.profiler.timer("state"):
+                self.load_arrays(arrays)
+
+    def report(self):
+        """Fill num_dict with the clustering results of the process."""
+        read_cluster, cluster_nums = self.final_clusters()
+        if self.config.output_file and self.config.mmr_mode is not True:
+            self.num_dict[self.name + "shard"] = self.write_shard(tb.cluster_members(read_cluster, cluster_nums, self.first_read))
+        self.num_dict[self.name + "cluster_nums"] = cluster_nums
+        if self.config.merge_mode:
+            self.num_dict[self.name + "representatives"] = self.cluster_table.representatives()
+        if self.config.Virtual_mode:
+            # the statistics of all the processes are computed at once by the main process
+            self.num_dict[self.name + "read_cluster"] = read_cluster[self.first_read:]
+            self.num_dict[self.name + "read_tags"] = self.read_tags[self.first_read:]
+
+    def final_clusters(self):
+        """Cluster of each read and number of clusters, after the verification of --verify."""
+        read_cluster = np.array(self.cluster_table.read_cluster, dtype=np.int64)
+        if self.read_seqs is None:
+            return read_cluster, len(self.cluster_table)
+        with self.profiler.timer("verify"):
+            read_cluster, cluster_nums = vr.split_clusters(self.read_seqs, read_cluster, len(self.cluster_table),
+                                                           self.config.verify_distance, self.config.verify_jobs)
+        self.profiler.count("verify_splits", cluster_nums - len(self.cluster_table))
+        return read_cluster, cluster_nums
+
+    def write_shard(self, members):
+        """Write the given clusters of the process to its shard file and return its path."""
+        output_format = self.config.output_format
+        path = op.shard_path(self.config.output_file, self.name, output_format)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        op.write_clusters(path, members, self.read_tags, output_format)
+        return path
+
+def stop_processes(process_dict, data_dict):
+    """Terminate the worker processes of a failed run without waiting for their input queues."""
+    for name in process_dict:
+        process_dict[name].terminate()
+        if hasattr(data_dict[name], "cancel_join_thread"):
+            data_dict[name].cancel_join_thread()
 
 def all_permutations(items, length):
     res = []
@@ -373,121 +571,350 @@ def all_permutations(items, length):
     track_back([])
     return ["".join(i) for i in res]
 
-def main():
-    pass
-
-if __name__ == '__main__':
-
+def feed_partitions(path, queues, prefix_len, chunk_size, profiler=pf.NullProfiler()):
+    """Stream the input file to the partition workers.
+
+    Reads are read chunk by chunk, packed into a PackedReads store, routed
+    to the worker named after their first prefix_len bases and sent as soon
+    as a chunk_size batch is full, so memory stays bounded by the queue sizes
+    regardless of the input size. Each queue is closed with a None sentinel.
+
+    Args:
+        path: str,Path of the input file.
+        queues: dict,Input queue of each worker, keyed by process name in
+            all_permutations order.
+        prefix_len: int,Number of leading bases used for partitioning.
+        chunk_size: int,Number of records in a chunk.
+        profiler: profiler.Profiler,Records the parse, pack and queue times.
+    """
+    names = list(queues)
+    buffers = {}.fromkeys(names)
+    counts = {}.fromkeys(names, 0)
+    for name in buffers:
+        buffers[name] = []
+    with tqdm(unit=" reads") as pbar:
+        for chunk in profiler.timed_iter(rd.read_chunks(path, chunk_size), "parse"):
+            with profiler.timer("pack"):
+                reads = rs.PackedReads.from_records(chunk)
+            profiler.count("reads_read", len(chunk))
+            profiler.count("reads_dropped", len(chunk) - len(reads))
+            if prefix_len == 0:
+                with profiler.timer("queue_put"):
+                    queues['all'].put(reads)
+            else:
+                keys = reads.prefix_keys(prefix_len)
+                order = np.argsort(keys, kind="stable")
+                bounds = np.searchsorted(keys[order], np.arange(len(names) + 1)).tolist()
+                for k, name in enumerate(names):
+                    if bounds[k] < bounds[k + 1]:
+                        buffers[name].append(reads.take(order[bounds[k]:bounds[k + 1]]))
+                        counts[name] += bounds[k + 1] - bounds[k]
+                    if counts[name] >= chunk_size:
+                        with profiler.timer("queue_put"):
+                            queues[name].put(rs.PackedReads.concat(buffers[name]))
+                        buffers[name] = []
+                        counts[name] = 0
+            pbar.update(len(chunk))
+    with profiler.timer("queue_put"):
+        for name in queues:
+            if buffers[name]:
+                queues[name].put(rs.PackedReads.concat(buffers[name]))
+            queues[name].put(None)
+
+def spill_buckets(path, spill_paths, fragment, read_len, chunk_size, profiler=pf.NullProfiler()):
+    """Partition the input file into hash buckets spilled to disk.
+
+    The bucket of a read is the DUHI hash of one of its fragments modulo
+    the number of buckets, so any number of buckets can be used and their
+    sizes do not depend on the base composition of the read ends. Reads
+    are packed chunk by chunk and each bucket's share of a chunk is
+    appended to its spill file, so memory stays bounded by one chunk.
+
+    Args:
+        path: str,Path of the input file.
+        spill_paths: list,Path of the spill file of each bucket.
+        fragment: int,Fragment used for partitioning, 0 for the front,
+            1 for the middle and 2 for the back fragment.
+        read_len: int,Length of read.
+        chunk_size: int,Number of records in a chunk.
+        profiler: profiler.Profiler,Records the parse, pack and spill times.
+
+    Returns:
+        Returns the list of the number of reads of each bucket.
+    """
+    bucket_nums = len(spill_paths)
+    counts = [0] * bucket_nums
+    with tqdm(unit=" reads") as pbar:
+        for chunk in profiler.timed_iter(rd.read_chunks(path, chunk_size), "parse"):
+            with profiler.timer("pack"):
+                reads = rs.PackedReads.from_records(chunk)
+            profiler.count("reads_read", len(chunk))
+            profiler.count("reads_dropped", len(chunk) - len(reads))
+            keys = hs.hash_packed(reads, read_len)[:, fragment] % bucket_nums
+            order = np.argsort(keys, kind="stable")
+            bounds = np.searchsorted(keys[order], np.arange(bucket_nums + 1)).tolist()
+            with profiler.timer("spill_write"):
+                for k in range(bucket_nums):
+                    if bounds[k] < bounds[k + 1]:
+                        rs.append_spill(spill_paths[k], reads.take(order[bounds[k]:bounds[k + 1]]))
+                        counts[k] += bounds[k + 1] - bounds[k]
+            pbar.update(len(chunk))
+    return counts
+
+def cluster_bucket(task):
+    """Cluster one spilled bucket in a pool worker and return its num_dict."""
+    name, spill_path, config = task
+    return MyProcess(name, spill_path, None, config).ship()
+
+def run_pool(path, names, jobs, fragment, read_len, chunk_size, profiler=pf.NullProfiler(), config=None):
+    """Cluster the input file with hash buckets scheduled on a worker pool.
+
+    Buckets are handed out one at a time, largest first, so a worker that
+    finishes early takes the next remaining bucket and the load evens out
+    for any number of workers.
+
+    Args:
+        path: str,Path of the input file.
+        names: list,Name of each bucket.
+        jobs: int,Number of worker processes.
+        fragment: int,Fragment used for partitioning, see spill_buckets.
+        read_len: int,Length of read.
+        chunk_size: int,Number of records in a chunk.
+        profiler: profiler.Profiler,Records the partitioning and result times.
+        config: load_config.Config,Configuration of the workers, the
+            default one if it is not given.
+
+    Returns:
+        Returns the merged num_dict of all the buckets.
+    """
+    spill_dir = tempfile.mkdtemp(prefix="clover_")
+    count_dict = {}
+    try:
+        spill_paths = [os.path.join(spill_dir, name) for name in names]
+        counts = spill_buckets(path, spill_paths, fragment, read_len, chunk_size, profiler)
+        order = np.argsort(counts, kind="stable")[::-1].tolist()
+        tasks = [(names[k], spill_paths[k], config) for k in order]
+        with Pool(min(jobs, len(tasks))) as pool:
+            results = profiler.timed_iter(pool.imap_unordered(cluster_bucket, tasks, chunksize=1), "result_wait")
+            for num_dict in tqdm(results, total=len(tasks), unit=" buckets"):
+                with profiler.timer("receive"):
+                    count_dict.update(tp.receive(num_dict))
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+    return count_dict
+
+def cluster_reads(source, config=None):
+    """Cluster reads in the calling process and return the cluster of each read.
+
+    This is the library entry point: no process is spawned, the command
+    line is not read and nothing is written unless a state_dir is given.
+
+    Args:
+        source: str,Path of an input file in any format of reader.iter_records,
+            or an iterable of (tag, read) records or of reads, a read given
+            alone is tagged with its position.
+        config: dict,Configuration entries to change, see
+            load_config.default_config, or a load_config.Config.
+
+    Returns:
+        Returns a tuple with the int64 array of the cluster id of each
+        clustered read and the list of their tags, in input order. Reads
+        shorter than read_len_min or with other bases than ATGC are left
+        out. With a state_dir the reads are added to the clusters saved by
+        earlier calls, which keep their ids, and only these reads are
+        returned.
+    """
+    if not isinstance(config, lc.Config):
+        config = lc.default_config(config)
+    if config.verify_mode and config.state_dir:
+        raise ValueError("verify_mode splits the clusters of a single call and cannot be used with a state_dir")
+    process = MyProcess("all", [], None, config)
+    state_dir = config.state_dir
+    if state_dir:
+        cp.check_partitions(state_dir, ["all"])
+        process.restore_state(cp.snapshot_path(state_dir, "all"))
+    batch_size = config.batch_size
+    if isinstance(source, (str, os.PathLike)):
+        chunks = rd.read_chunks(os.fspath(source), batch_size)
+    else:
+        records = ((str(i), record) if isinstance(record, str) else record for i, record in enumerate(source))
+        chunks = iter(lambda: list(itertools.islice(records, batch_size)), [])
+    for chunk in chunks:
+        process.cluster_batch(rs.PackedReads.from_records(chunk))
+    if state_dir:
+        process.save_state(cp.snapshot_path(state_dir, "all"))
+    start = process.first_read
+    return process.final_clusters()[0][start:], process.read_tags[start:]
+
+def run_clover(config):
+    """Cluster the input file of a configuration with worker processes and write the output.
+
+    This is the clover command: the input is partitioned between processes
+    by prefix (-P) or hash bucket (-j, --buckets), the clusters are written
+    to the output file and, for tagged input, the statistics are printed.
+
+    Args:
+        config: load_config.Config,Configuration, as given by load_config.out_put_config.
+
+    Returns:
+        Returns the statistics of evaluate.evaluate for tagged input, None
+        otherwise.
+    """
     #******************************************************************************************
-    config_dict=lc.out_put_config()
-
-    tag_nums=config_dict['tag_nums']
-    PROCESS_INDEX= int(config_dict['processes_nums'])
+    tag_nums=config.tag_nums
+    PROCESS_INDEX= int(config.processes_nums)
     
     #******************************************************************************************
     
-    print(config_dict['tag'])
-
-    if PROCESS_INDEX == 0 and config_dict['fast_mode'] == True :
+    print(lc.TAG)
+    profiler = pf.make_profiler(config.profile_mode)
+    if config.resume_mode == True and not config.checkpoint_dir :
+        raise ValueError("--resume needs the --checkpoint directory of the interrupted run")
+
+    if config.pool_mode == True and config.fast_mode == True :
+        # Hash buckets scheduled on a pool of workers, the -P prefix partitioning is not used
+        N_JOBS = config.jobs or os.cpu_count()
+        N_PROCESS = config.partition_buckets or 4 * N_JOBS
+        process_names = ["bucket%d" % k for k in range(N_PROCESS)]
+    elif PROCESS_INDEX == 0 :
         N_PROCESS=1
         process_names=['all']
-        print("Generating data")
-        data_dict = {}
-        data_dict['all']=[]
-        f= open(config_dict['input_path'],'r').readlines()
-        for i in tqdm(f):
-            if "N" in i :
-                pass
-            else:
-                data_dict['all'].append(i)
-    elif PROCESS_INDEX == 0 and config_dict['fast_mode'] == False :
-        N_PROCESS=1
-        process_names=['all']
-        data_dict = {}
-        data_dict['all']=[]
     elif PROCESS_INDEX > 0 :
         N_PROCESS = 4**PROCESS_INDEX
         process_names = all_permutations(["A","T","G","C"],PROCESS_INDEX)
 
-
-        
-        st_pre = time.time()
+    # compressed input cannot be mapped and is streamed
+    mapped = (config.pool_mode != True and config.fast_mode == True and config.mmap_mode == True and
+              rd.detect_format(config.input_path) == "txt" and not rd.is_compressed(config.input_path))
+    if mapped and config.checkpoint_dir :
+        # the processes scan the mapped file by themselves, without counting the reads consumed
+        raise ValueError("--checkpoint and --resume cannot be used with --mmap")
+    if config.verify_mode == True :
+        # the split clusters only exist in the output of the processes
+        if config.state_dir :
+            raise ValueError("--verify splits the clusters of a single run and cannot be used with --state")
+        if config.merge_mode == True and N_PROCESS > 1 :
+            raise ValueError("--verify splits the clusters after --merge compares them, they cannot be used together")
+        if N_PROCESS > 1 and config.verify_jobs > 1 :
+            # every partition would start its own pool of verify_jobs workers
+            config = dataclasses.replace(config, verify_jobs=1)
+    if config.checkpoint_dir :
+        # snapshots of another partitioning would skip the wrong reads as consumed
+        if config.resume_mode == True :
+            cp.check_partitions(config.checkpoint_dir, process_names)
+        else :
+            cp.record_partitions(config.checkpoint_dir, process_names)
+    if config.state_dir :
+        # reads are added to the clusters of the earlier runs, which keep their ids
+        if config.merge_mode == True and N_PROCESS > 1 :
+            raise ValueError("--merge relabels the clusters and cannot be used with --state")
+        cp.check_partitions(config.state_dir, process_names)
+
+    if config.pool_mode == True and config.fast_mode == True :
+        st = time.time()
+        print("Partitioning the data into", N_PROCESS, "buckets on", N_JOBS, "workers")
+        count_dict = run_pool(config.input_path, process_names, N_JOBS, config.partition_fragment,
+                              config.read_len, config.batch_size, profiler, config)
+        print("Time:",time.time()-st)
+    else:
+        # In fast mode every worker receives its reads chunk by chunk through a bounded queue,
+        # in mmap mode the byte range of the input file it scans by itself
         data_dict = {}.fromkeys(process_names)
         for i in data_dict:
-            data_dict[i] = []
-
-
-        if config_dict['fast_mode'] == True:
-            print("Pre-process the data")
-            f= open(config_dict['input_path'],'r').readlines()
-            for i in tqdm(f):
-                if "N" in i or "*" in i :
-                    pass
-                else:
-                    data_dict[i.split()[1][:PROCESS_INDEX]].append(i)
-        else:
-            data_dict[i] = []
-
-
-
-    q_output = Queue(N_PROCESS*2)
-
-    st = time.time()
-    process_dict = {}.fromkeys(process_names)
-
-    for i in process_dict:
-        process_dict[i] = MyProcess(i, data_dict[i], q_output)
-
-    for i in process_dict:
-        process_dict[i].start()
-
-    st = time.time()
-    count_dict={}
-    i=0
-    while True :
-        if i == N_PROCESS :
-            break
-        count_dict.update(q_output.get())
-        i=i+1
-    print("Time:",time.time()-st)
-
-    for i in process_dict:
-        process_dict[i].join()
-    
-    new_count_dict={}
-    new_count_dict["sum_read_num"]=0
-    new_count_dict["error_num"]=0
-    new_count_dict["sum_cluster_num"]=0
-    new_count_dict["sum_tag"]={}
-    new_count_dict["index_list"]=[]
-    for key in process_dict :
-        new_count_dict["sum_read_num"]+=count_dict[key+"sum_read_num"]
-        new_count_dict["error_num"]+=count_dict[key+"error_num"]
-        new_count_dict["sum_cluster_num"]+=count_dict[key+"sum_cluster_num"]
-        tag_list=count_dict[key+"sum_tag"]
-        #print(count_dict[key+"saved_clusters"])
-        
-        for i in tag_list:
-            if i in new_count_dict["sum_tag"]:
-                pass
+            if mapped:
+                data_dict[i] = (0, os.path.getsize(config.input_path))
+            elif config.fast_mode == True:
+                data_dict[i] = Queue(config.queue_chunks)
             else:
-                new_count_dict["sum_tag"][i]=1
-    if 'output_file' in config_dict and config_dict["mmr_mode"] is not True:
-        for key in process_dict :
-            new_count_dict["index_list"]+=count_dict[key+"index_list"]
-        output_file = open(config_dict['output_file'],'w')
-        output_file.write(str(new_count_dict["index_list"]))
-        #print(new_count_dict["index_list"])
-        output_file.close()
-    if config_dict['Virtual_mode'] == True :
-        #print("Number of reads processed:",new_count_dict["sum_read_num"],new_count_dict["error_num"],new_count_dict["sum_cluster_num"])
-        print("Number of reads processed:",new_count_dict["sum_read_num"])
-        print("Accuracy：",(new_count_dict["sum_read_num"]-new_count_dict["error_num"])/new_count_dict["sum_read_num"])
-        if config_dict['tag_mode'] == True :
-            print("Number of Clusters: ",(new_count_dict["sum_cluster_num"]))
-            print("Coverage：",len(new_count_dict["sum_tag"])/int(tag_nums))
-            print("Redundancy Rate：",(new_count_dict["sum_cluster_num"]-int(tag_nums))/int(tag_nums))
-    elif config_dict['Statistical_model'] == True :
+                data_dict[i] = []
+
+        q_output = Queue(N_PROCESS*2)
+
+        if config.input_path :
+            # a missing input fails here rather than in the driver with the workers waiting for it
+            rd.open_input(config.input_path).close()
+
+        st = time.time()
+        process_dict = {}.fromkeys(process_names)
+
+        for i in process_dict:
+            process_dict[i] = MyProcess(i, data_dict[i], q_output, config)
+
+        for i in process_dict:
+            process_dict[i].start()
+
+        st = time.time()
+        if config.fast_mode == True and not isinstance(data_dict[process_names[0]], tuple):
+            print("Streaming the data")
+            try:
+                feed_partitions(config.input_path, data_dict, PROCESS_INDEX, config.batch_size, profiler)
+            except BaseException:
+                # the workers would wait for the rest of their input forever
+                stop_processes(process_dict, data_dict)
+                raise
+
+        count_dict={}
+        i=0
+        while True :
+            if i == N_PROCESS :
+                break
+            with profiler.timer("result_wait"):
+                results = q_output.get()
+            if tp.ERROR_KEY in results:
+                # receive raises the error, the other processes and their input are not waited for
+                stop_processes(process_dict, data_dict)
+            with profiler.timer("receive"):
+                count_dict.update(tp.receive(results))
+            i=i+1
+        print("Time:",time.time()-st)
+
+        for i in process_dict:
+            process_dict[i].join()
+
+    # Processes that clustered their input, the others only ran in the --low mode
+    result_names = [key for key in process_names if key+"cluster_nums" in count_dict]
+    if config.checkpoint_dir :
+        # the run is complete, a later --resume must not restore it
+        cp.remove(config.checkpoint_dir, process_names)
+    if config.merge_mode == True and config.fast_mode == True and N_PROCESS > 1 :
+        with profiler.timer("merge"):
+            labels = mg.merge_partitions([count_dict[key+"representatives"] for key in result_names],
+                                         config.match_nums)
+    elif config.state_dir :
+        labels = op.stable_labels([count_dict[key+"cluster_nums"] for key in result_names])
+    else:
+        labels = op.offset_labels([count_dict[key+"cluster_nums"] for key in result_names])
+    if config.output_file and config.mmr_mode is not True and result_names:
+        # The workers have written their clusters to shard files, only relabel and concatenate them
+        with profiler.timer("output"):
+            op.concat_shards([count_dict[key+"shard"] for key in result_names], labels,
+                             op.output_path(config.output_file, config.output_format), config.output_format)
+        shutil.rmtree(op.shard_dir(config.output_file), ignore_errors=True)
+    stats = None
+    if config.Virtual_mode == True :
+        read_cluster = np.concatenate([np.zeros(0, dtype=np.int64)] + [key_labels[count_dict[key+"read_cluster"]] for key, key_labels in zip(result_names, labels)])
+        read_tags = [tag for key in result_names for tag in count_dict[key+"read_tags"]]
+        with profiler.timer("evaluate"):
+            stats = ev.evaluate(read_cluster, read_tags, int(tag_nums) if config.tag_mode == True else None, config.Cluster_size_threshold)
+        print("Number of reads processed:",stats["counted_reads"])
+        print("Accuracy：",stats["accuracy"])
+        print("Purity：",stats["purity"])
+        print("Adjusted Rand Index：",stats["ari"])
+        if config.tag_mode == True :
+            print("Number of Clusters: ",stats["clusters"])
+            print("Coverage：",stats["coverage"])
+            print("Redundancy Rate：",stats["redundancy"])
+    elif config.Statistical_model == True :
         pass
+    if profiler.enabled :
+        worker_reports = {key: count_dict[key+"profile"] for key in result_names if key+"profile" in count_dict}
+        print(json.dumps({"main": profiler.report(), "workers": worker_reports,
+                          "workers_total": pf.merge_reports(worker_reports.values())}, indent=2))
+    return stats
 
-    main()
\ No newline at end of file
+def main(argv=None):
+    """Entry point of the clover command, argv defaults to the command line."""
+    run_clover(lc.out_put_config(argv))
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,7 @@ multi-process implementation and data statistics of Clover.
 """
 
 from collections import  Counter
+import dataclasses
 from multiprocessing import Process, Queue
 import os
 import time
@@ -15,6 +16,12 @@ from clover import align as ag
 from clover import load_config as lc
 from clover import tree as tr
 
+def config_entries(config):
+    """Entries of a load_config.Config as the dict used by this engine."""
+    config_dict = dataclasses.asdict(config)
+    config_dict['tag'] = lc.TAG
+    return config_dict
+
 class MyProcess(Process):
     """Process Class
 
@@ -101,18 +108,18 @@ class MyProcess(Process):
         type: int
     """
 
-    def __init__(self, name, data, q_output):
+    def __init__(self, name, data, q_output, config_dict=None):
         Process.__init__(self)
-        self.config_dict=lc.out_put_config()
+        self.config_dict = config_entries(lc.Config()) if config_dict is None else config_dict
         self.name = name
         self.data = data
         self.q_output = q_output
         self.q_output_temp = []
-        self.a_tree = tr.Trie() 
-        self.b_tree = tr.Trie()  
-        self.c_tree = tr.Trie()
+        self.a_tree = tr.FlatTrie() 
+        self.b_tree = tr.FlatTrie()  
+        self.c_tree = tr.FlatTrie()
         if self.config_dict['other_tree_nums'] == 2 :
-            self.d_tree = tr.Trie()
+            self.d_tree = tr.FlatTrie()
         self.Cluster_size_threshold = self.config_dict['Cluster_size_threshold']
         self.ref_list={}    
         self.ref_dict={}     
@@ -188,11 +195,8 @@ class MyProcess(Process):
                     if self.config_dict["now_align_alg"] == True:
                         error_list=ag.global_align(self.ref_list[align_list[0]],dna_str)
                     else:
-                        if dna_str_num==self.read_len :
-                            if self.ref_list[align_list[0]] == dna_str:
-                                pass
-                            else:
-                                error_list=ag.global_align(self.ref_list[align_list[0]],dna_str)
+                        if self.ref_list[align_list[0]] != dna_str:
+                            error_list=ag.myers_align(self.ref_list[align_list[0]],dna_str)
                         
                     for line in error_list:
 
@@ -202,7 +206,7 @@ class MyProcess(Process):
                                 self.ref_error_dict[align_list[0]][line[0]]=self.ref_error_dict[align_list[0]][line[0]]+1
                             else:
                                 self.ref_error_dict[align_list[0]][line[0]]=1
-                            if self.ref_error_dict[align_list[0]][line[0]]/self.ref_error_dict[align_list[0]]["nums"] >0.5 and self.ref_error_dict[a_align[0]][line[0]]>5 :
+                            if self.ref_error_dict[align_list[0]][line[0]]/self.ref_error_dict[align_list[0]]["nums"] >0.5 and self.ref_error_dict[align_list[0]][line[0]]>5 :
                                 now_read=self.ref_list[align_list[0]][:line[0]]+line[1]+self.ref_list[align_list[0]][line[0]+1:]
 
                                 self.a_tree.insert(now_read[:self.dna_tree_nums],align_list[0])
@@ -230,11 +234,8 @@ class MyProcess(Process):
                     if self.config_dict["now_align_alg"] == True:
                         error_list=ag.global_align(self.ref_list[align_list[0]],dna_str)
                     else:
-                        if dna_str_num==self.read_len :
-                            if self.ref_list[align_list[0]] == dna_str:
-                                pass
-                            else:
-                                error_list=ag.global_align(self.ref_list[align_list[0]],dna_str)
+                        if self.ref_list[align_list[0]] != dna_str:
+                            error_list=ag.myers_align(self.ref_list[align_list[0]],dna_str)
                         
                     for line in error_list:
                         if align_list[0] in self.ref_error_dict : 
@@ -243,7 +244,7 @@ class MyProcess(Process):
                                 self.ref_error_dict[align_list[0]][line[0]]=self.ref_error_dict[align_list[0]][line[0]]+1
                             else:
                                 self.ref_error_dict[align_list[0]][line[0]]=1
-                            if self.ref_error_dict[align_list[0]][line[0]]/self.ref_error_dict[align_list[0]]["nums"] >0.5 and self.ref_error_dict[a_align[0]][line[0]]>5 :
+                            if self.ref_error_dict[align_list[0]][line[0]]/self.ref_error_dict[align_list[0]]["nums"] >0.5 and self.ref_error_dict[align_list[0]][line[0]]>5 :
                                 now_read=self.ref_list[align_list[0]][:line[0]]+line[1]+self.ref_list[align_list[0]][line[0]+1:]
 
                                 self.a_tree.insert(now_read[:self.dna_tree_nums],align_list[0])
@@ -290,11 +291,8 @@ class MyProcess(Process):
                             if self.config_dict["now_align_alg"] == True:
                                 error_list=ag.global_align(self.ref_list[align_list[0]],dna_str)
                             else:
-                                if dna_str_num==self.read_len :
-                                    if self.ref_list[align_list[0]] == dna_str:
-                                        pass
-                                    else:
-                                        error_list=ag.global_align(self.ref_list[align_list[0]],dna_str)
+                                if self.ref_list[align_list[0]] != dna_str:
+                                    error_list=ag.myers_align(self.ref_list[align_list[0]],dna_str)
                                 
                             for line in error_list:
                                 if align_list[0] in self.ref_error_dict : 
@@ -303,7 +301,7 @@ class MyProcess(Process):
                                         self.ref_error_dict[align_list[0]][line[0]]=self.ref_error_dict[align_list[0]][line[0]]+1
                                     else:
                                         self.ref_error_dict[align_list[0]][line[0]]=1
-                                    if self.ref_error_dict[align_list[0]][line[0]]/self.ref_error_dict[align_list[0]]["nums"] >0.5 and self.ref_error_dict[a_align[0]][line[0]]>5 :
+                                    if self.ref_error_dict[align_list[0]][line[0]]/self.ref_error_dict[align_list[0]]["nums"] >0.5 and self.ref_error_dict[align_list[0]][line[0]]>5 :
                                         now_read=self.ref_list[align_list[0]][:line[0]]+line[1]+self.ref_list[align_list[0]][line[0]+1:]
 
                                         self.a_tree.insert(now_read[:self.dna_tree_nums],align_list[0])
@@ -517,7 +515,7 @@ def main():
 if __name__ == '__main__':
 
     #******************************************************************************************
-    config_dict=lc.out_put_config()
+    config_dict=config_entries(lc.out_put_config())
 
     tag_nums=config_dict['tag_nums']
     PROCESS_INDEX= int(config_dict['processes_nums'])
@@ -575,7 +573,7 @@ if __name__ == '__main__':
     process_dict = {}.fromkeys(process_names)
 
     for i in process_dict:
-        process_dict[i] = MyProcess(i, data_dict[i], q_output)
+        process_dict[i] = MyProcess(i, data_dict[i], q_output, config_dict)
 
     for i in process_dict:
         process_dict[i].start()
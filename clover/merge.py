@@ -0,0 +1,128 @@
+"""Partition Merge Module
+
+This module merges the clusters built independently by the partition
+processes. Reads with a sequencing error in the bases used for partitioning
+end up in the wrong partition and form redundant clusters there; these are
+found by comparing cluster representatives across partitions with the same
+match rule as the clustering itself, 2 of 3 fragments by default.
+
+"""
+
+import numpy as np
+
+from clover import index as ix
+
+
+def find_root(parent, i):
+    """Root of an element in a union-find forest, with path halving."""
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def group_edges(reps, part, fragment_groups):
+    """Pairs of clusters of different partitions equal over one of fragment_groups.
+
+    The clusters are sorted once per group, the first cluster of each run
+    of equal hashes spanning several partitions is paired with the others.
+
+    Args:
+        reps: numpy.ndarray,Representative hashes of all the clusters.
+        part: numpy.ndarray,Partition of each cluster.
+        fragment_groups: tuple,Groups of fragments, as given by
+            index.match_groups.
+
+    Returns:
+        Returns an int64 array of (cluster, cluster) rows.
+    """
+    edges = []
+    for group in fragment_groups:
+        # rows of equal hashes over the fragments of the group get the same key
+        keys = np.unique(reps[:, list(group)], axis=0, return_inverse=True)[1].reshape(-1)
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        part_min = np.minimum.reduceat(part[order], starts)
+        part_max = np.maximum.reduceat(part[order], starts)
+        group = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(order)]))
+        cross = (part_min != part_max)[group]
+        first = order[starts][group]
+        edges.append(np.stack([first[cross], order[cross]], axis=1))
+    return np.concatenate(edges) if edges else np.zeros((0, 2), dtype=np.int64)
+
+
+def count_edges(reps, part, match_nums):
+    """Pairs of clusters of different partitions equal in match_nums fragments.
+
+    Like index.first_shared, the clusters sharing a bucket with a cluster
+    are counted over its fragments, so the cost is the total size of the
+    buckets rather than one sort per fragment group.
+
+    Args:
+        reps: numpy.ndarray,Representative hashes of all the clusters.
+        part: numpy.ndarray,Partition of each cluster.
+        match_nums: int,Number of equal fragments for a match.
+
+    Returns:
+        Returns an int64 array of (cluster, cluster) rows.
+    """
+    part = part.tolist()
+    buckets = [{} for _ in range(reps.shape[1])]
+    edges = []
+    for i, row in enumerate(reps.tolist()):
+        counts = {}
+        for bucket, hash_val in zip(buckets, row):
+            earlier = bucket.get(hash_val)
+            if earlier is None:
+                bucket[hash_val] = [i]
+                continue
+            for j in earlier:
+                counts[j] = counts.get(j, 0) + 1
+            earlier.append(i)
+        edges += [(j, i) for j, count in counts.items() if count >= match_nums and part[j] != part[i]]
+    return np.array(edges, dtype=np.int64).reshape(-1, 2)
+
+
+def merge_partitions(representatives, match_nums=2):
+    """Union the clusters of different partitions whose representatives match.
+
+    Two clusters match if the representative hashes of match_nums of their
+    fragments are equal. Only groups of matching clusters that span several
+    partitions are merged.
+
+    Args:
+        representatives: list,One (cluster_nums, fragment_nums) array of
+            representative hashes per partition.
+        match_nums: int,Number of equal fragments for a match.
+
+    Returns:
+        Returns a list with one int64 array per partition giving the merged
+        cluster label of each of its clusters. Labels are numbered from 0 in
+        order of first appearance.
+    """
+    counts = [len(reps) for reps in representatives]
+    if sum(counts) == 0:
+        return [np.zeros(0, dtype=np.int64) for _ in counts]
+    reps = np.concatenate([np.asarray(r, dtype=np.int64).reshape(len(r), -1) for r in representatives if len(r)])
+    part = np.repeat(np.arange(len(counts)), counts)
+
+    groups = ix.match_groups(reps.shape[1], match_nums)
+    if len(groups) <= reps.shape[1]:
+        edges = group_edges(reps, part, groups)
+    else:
+        # too many fragment groups to sort the clusters once per group
+        edges = count_edges(reps, part, match_nums)
+
+    parent = list(range(len(reps)))
+    for u, v in edges.tolist():
+        ru, rv = find_root(parent, u), find_root(parent, v)
+        if ru != rv:
+            # The smallest id stays the root, so labels follow first appearance
+            if ru < rv:
+                parent[rv] = ru
+            else:
+                parent[ru] = rv
+    roots = np.array([find_root(parent, i) for i in range(len(reps))], dtype=np.int64)
+    labels = np.unique(roots, return_inverse=True)[1].reshape(-1)
+    return np.split(labels, np.cumsum(counts)[:-1])
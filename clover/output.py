@@ -0,0 +1,153 @@
+"""Cluster Output Module
+
+This module writes clustering results. Every process writes its clusters to
+its own shard file as soon as it has finished, and the main process only
+assembles the shards into the output file, relabelling the clusters with
+global ids on the way.
+
+A cluster file is either a TSV file with one cluster_id<TAB>read_id line per
+read, or a binary NumPy .npz file with the cluster id of each read and the
+read ids stored as one byte buffer with offsets.
+
+"""
+
+import os
+
+import numpy as np
+
+from clover import store as rs
+
+OUTPUT_FORMATS = ("tsv", "npz")
+
+
+def check_format(output_format):
+    """Raise a ValueError if the output format is not supported."""
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError("Unknown output format: %s" % output_format)
+
+
+def shard_dir(output_file):
+    """Directory holding the shard files of an output file."""
+    return output_file + ".shards"
+
+
+def shard_path(output_file, name, output_format="tsv"):
+    """Path of the shard file written by the process called name."""
+    return os.path.join(shard_dir(output_file), name + "." + output_format)
+
+
+def output_path(output_file, output_format="tsv"):
+    """Path of the assembled output, the output file itself for tsv."""
+    if output_format == "tsv":
+        return output_file
+    return os.path.splitext(output_file)[0] + "." + output_format
+
+
+def offset_labels(cluster_nums):
+    """Global cluster ids of unmerged shards, numbered one shard after another.
+
+    Args:
+        cluster_nums: list,Number of clusters of each shard.
+
+    Returns:
+        Returns a list with one int64 array per shard mapping its cluster ids
+        to global ones.
+    """
+    starts = np.cumsum([0] + list(cluster_nums))
+    return [np.arange(starts[k], starts[k + 1], dtype=np.int64) for k in range(len(cluster_nums))]
+
+
+def stable_labels(cluster_nums):
+    """Global cluster ids that stay the same when the shards gain clusters.
+
+    Cluster i of shard k gets the id i * shards + k, used when reads are
+    added to an existing clustering with --state. With a single shard the
+    ids are those of offset_labels.
+
+    Args:
+        cluster_nums: list,Number of clusters of each shard.
+
+    Returns:
+        Returns a list with one int64 array per shard mapping its cluster ids
+        to global ones.
+    """
+    shards = len(cluster_nums)
+    return [np.arange(n, dtype=np.int64) * shards + k for k, n in enumerate(cluster_nums)]
+
+
+def write_clusters(path, members, read_tags, output_format="tsv"):
+    """Write clusters to a cluster file.
+
+    Args:
+        path: str,Path of the file.
+        members: list,Read numbers of each cluster, as given by
+            ClusterTable.members.
+        read_tags: list,Tag of each read.
+        output_format: str,One of OUTPUT_FORMATS.
+    """
+    check_format(output_format)
+    if output_format == "npz":
+        sizes = np.fromiter(map(len, members), dtype=np.int64, count=len(members))
+        tag_data, tag_offsets = rs.encode_tags([read_tags[i] for reads in members for i in reads])
+        np.savez(path, cluster=np.repeat(np.arange(len(members), dtype=np.int64), sizes),
+                 tag_data=np.frombuffer(tag_data, dtype=np.uint8), tag_offsets=tag_offsets)
+    else:
+        with open(path, "w") as f:
+            for idx, reads in enumerate(members):
+                f.write("".join(["%d\t%s\n" % (idx, read_tags[i]) for i in reads]))
+
+
+def read_clusters(path, output_format="tsv"):
+    """Read a cluster file.
+
+    Returns:
+        Returns a tuple with the int64 array of the cluster id of each read
+        and the list of read ids, in file order.
+    """
+    check_format(output_format)
+    if output_format == "npz":
+        with np.load(path) as data:
+            return data["cluster"], rs.decode_tags(data["tag_data"].tobytes(), data["tag_offsets"])
+    clusters = []
+    tags = []
+    with open(path) as f:
+        for line in f:
+            idx, tag = line.rstrip("\n").split("\t", 1)
+            clusters.append(int(idx))
+            tags.append(tag)
+    return np.array(clusters, dtype=np.int64), tags
+
+
+def concat_shards(shard_paths, labels, path, output_format="tsv"):
+    """Assemble shard files into the output file.
+
+    TSV shards are streamed line by line, so the whole result is never held
+    in memory. Reads keep their shard order, reads of a merged cluster may
+    therefore come from several places of the file.
+
+    Args:
+        shard_paths: list,Path of each shard file.
+        labels: list,One array per shard mapping its cluster ids to the
+            global ones, as given by offset_labels or merge.merge_partitions.
+        path: str,Path of the output file.
+        output_format: str,One of OUTPUT_FORMATS.
+    """
+    check_format(output_format)
+    if output_format == "npz":
+        clusters, tag_data, tag_lengths = [], [], []
+        for shard, shard_labels in zip(shard_paths, labels):
+            with np.load(shard) as data:
+                clusters.append(np.asarray(shard_labels, dtype=np.int64)[data["cluster"]])
+                tag_data.append(data["tag_data"])
+                tag_lengths.append(np.diff(data["tag_offsets"]))
+        np.savez(path, cluster=np.concatenate(clusters or [np.zeros(0, dtype=np.int64)]),
+                 tag_data=np.concatenate(tag_data or [np.zeros(0, dtype=np.uint8)]),
+                 tag_offsets=rs.csr_offsets(np.concatenate(tag_lengths or [np.zeros(0, dtype=np.int64)])))
+        return
+    with open(path, "w") as out:
+        for shard, shard_labels in zip(shard_paths, labels):
+            label_strs = [str(label) + "\t" for label in np.asarray(shard_labels).tolist()]
+            with open(shard) as f:
+                for line in f:
+                    idx, _, tag = line.partition("\t")
+                    out.write(label_strs[int(idx)] + tag)
@@ -0,0 +1,94 @@
+"""Profiler Module
+
+This module records named counters and timers of a run. Processes and the
+main process each keep their own profiler and the reports are gathered as
+JSON at the end of the run. When profiling is off a NullProfiler with the
+same interface is used, whose methods do nothing.
+
+"""
+
+import contextlib
+import time
+
+
+class Profiler:
+    """Profiler Class
+
+    Attributes:
+        counters: dict,Value of each counter.
+        timers: dict,Accumulated seconds of each timer.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self.counters = {}
+        self.timers = {}
+
+    def count(self, name, n=1):
+        """Add n to a counter."""
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def add_time(self, name, seconds):
+        """Add seconds to a timer."""
+        self.timers[name] = self.timers.get(name, 0.0) + seconds
+
+    @contextlib.contextmanager
+    def timer(self, name):
+        """Context manager adding the time spent in its block to a timer."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def timed_iter(self, iterable, name):
+        """Yield the items of an iterable, adding the time spent producing them to a timer."""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_time(name, time.perf_counter() - start)
+                return
+            self.add_time(name, time.perf_counter() - start)
+            yield item
+
+    def report(self):
+        """Counters and timers as a JSON serializable dict."""
+        return {"counters": dict(self.counters), "timers": dict(self.timers)}
+
+
+class NullProfiler(Profiler):
+    """Profiler that records nothing."""
+
+    enabled = False
+
+    def count(self, name, n=1):
+        pass
+
+    def add_time(self, name, seconds):
+        pass
+
+    def timer(self, name):
+        return contextlib.nullcontext()
+
+    def timed_iter(self, iterable, name):
+        return iterable
+
+
+def make_profiler(enabled):
+    """Profiler if enabled, NullProfiler otherwise."""
+    return Profiler() if enabled else NullProfiler()
+
+
+def merge_reports(reports):
+    """Sum the counters and timers of several reports."""
+    merged = Profiler()
+    for report in reports:
+        for name, value in report["counters"].items():
+            merged.count(name, value)
+        for name, value in report["timers"].items():
+            merged.add_time(name, value)
+    return merged.report()
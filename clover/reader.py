@@ -0,0 +1,207 @@
+"""Input Reading Module
+
+This module streams the records of txt, fasta and fastq input files (plain,
+gzip or bzip2) in bounded-size chunks, so the whole file never has to be
+held in memory before clustering starts. It also scans memory-mapped txt
+input files in place for the mmap input mode.
+
+"""
+
+import bz2
+import gzip
+import mmap
+import os
+
+import numpy as np
+
+MAP_WINDOW = 1 << 26
+
+FASTA_EXTS = (".fa", ".fasta", ".fna", ".fas")
+FASTQ_EXTS = (".fq", ".fastq")
+COMPRESSED_EXTS = (".gz", ".bz2")
+
+
+def detect_format(path):
+    """Detect the format of the input file from its extension.
+
+    A trailing .gz or .bz2 extension is ignored.
+
+    Args:
+        path: str,Path of the input file.
+
+    Returns:
+        Returns "fasta", "fastq" or "txt".
+    """
+    name = path.lower()
+    for ext in COMPRESSED_EXTS:
+        if name.endswith(ext):
+            name = name[:-len(ext)]
+    ext = os.path.splitext(name)[1]
+    if ext in FASTA_EXTS:
+        return "fasta"
+    if ext in FASTQ_EXTS:
+        return "fastq"
+    return "txt"
+
+
+def is_compressed(path):
+    """Whether the input file is gzip or bzip2 compressed, judged from its extension."""
+    return path.lower().endswith(COMPRESSED_EXTS)
+
+
+def open_input(path):
+    """Open the input file as text, decompressing .gz and .bz2 files on the fly."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rt")
+    return open(path, "r")
+
+
+def iter_records(path, file_format=None):
+    """Stream the records of the input file.
+
+    Args:
+        path: str,Path of the input file, in txt, fasta or fastq format,
+            optionally compressed with gzip or bzip2.
+        file_format: str,Format of the input file, detected from the file
+            extension if None.
+
+    Returns:
+        Yields (id, read) tuples. The id is the index/tag of a txt line or the
+        first word of a fasta/fastq header.
+    """
+    if file_format is None:
+        file_format = detect_format(path)
+    with open_input(path) as f:
+        if file_format == "fasta":
+            name = None
+            seq = []
+            for line in f:
+                if line.startswith(">"):
+                    if name is not None:
+                        yield name, "".join(seq)
+                    header = line[1:].split(None, 1)
+                    name = header[0] if header else ""
+                    seq = []
+                else:
+                    seq.append(line.strip())
+            if name is not None:
+                yield name, "".join(seq)
+        elif file_format == "fastq":
+            for line in f:
+                if not line.startswith("@"):
+                    continue
+                header = line[1:].split(None, 1)
+                seq = next(f, "")
+                # Skip the separator and the quality lines without looking at them
+                next(f, None)
+                next(f, None)
+                yield header[0] if header else "", seq.strip()
+        else:
+            for line in f:
+                record = line.split()
+                if len(record) >= 2:
+                    yield record[0], record[1]
+
+
+def read_chunks(path, chunk_size, skip=("N", "*"), file_format=None):
+    """Read the input file chunk by chunk.
+
+    Args:
+        path: str,Path of the input file, see iter_records.
+        chunk_size: int,Maximum number of records in a chunk.
+        skip: tuple,Reads containing any of these characters are dropped.
+        file_format: str,Format of the input file, detected if None.
+
+    Returns:
+        Yields lists of (id, read) records.
+    """
+    chunk = []
+    for record in iter_records(path, file_format):
+        if any(ch in record[1] for ch in skip):
+            continue
+        chunk.append(record)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def map_input(path):
+    """Memory-map the input file read-only.
+
+    Only uncompressed files can be mapped, see is_compressed.
+
+    Args:
+        path: str,Path of the input file.
+
+    Returns:
+        Returns an mmap object, or None if the file is empty.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def scan_mapped(buf, start, end, prefix=b"", window=MAP_WINDOW, bases=b"ACGT"):
+    """Locate the records of a byte range of a mapped input file.
+
+    The range is scanned window by window with NumPy directly on the mapped
+    bytes, no str object is created for a line. Lines are expected to be
+    [index/tag] [read] separated by a single space or tab.
+
+    Args:
+        buf: mmap,Mapped input file.
+        start: int,First byte of the range, at the beginning of a line.
+        end: int,End of the range, at the end of a line or of the file.
+        prefix: bytes,Only reads starting with these bases are kept.
+        window: int,Approximate number of bytes scanned at once.
+        bases: bytes,Lines whose read holds any other character are
+            dropped, as the streaming path drops them; the tag is not
+            checked.
+
+    Returns:
+        Yields tuples (view, tag_starts, seq_starts, seq_lens) for each
+        window: view is a uint8 array over the window and the other arrays
+        the positions of the kept records in view.
+    """
+    allowed = np.zeros(256, dtype=bool)
+    allowed[list(bases)] = True
+    pos = start
+    while pos < end:
+        stop = min(pos + window, end)
+        if stop < end:
+            nl = buf.rfind(b"\n", pos, stop)
+            if nl == -1:
+                nl = buf.find(b"\n", stop, end)
+            stop = end if nl == -1 else nl + 1
+        view = np.frombuffer(buf, dtype=np.uint8, count=stop - pos, offset=pos)
+        pos = stop
+
+        line_ends = np.flatnonzero(view == 10)
+        if len(line_ends) == 0 or line_ends[-1] != len(view) - 1:
+            line_ends = np.append(line_ends, len(view))
+        line_starts = np.empty_like(line_ends)
+        line_starts[0] = 0
+        line_starts[1:] = line_ends[:-1] + 1
+
+        # Drop trailing carriage returns
+        cr = (line_ends > line_starts) & (view[np.maximum(line_ends - 1, 0)] == 13)
+        line_ends = line_ends - cr
+
+        seps = np.flatnonzero((view == 32) | (view == 9))
+        sep_idx = np.searchsorted(seps, line_starts)
+        sep = np.append(seps, len(view))[sep_idx]
+        keep = sep < line_ends
+        seq_starts = sep + 1
+        bad = np.flatnonzero(~allowed[view])
+        keep &= np.searchsorted(bad, line_ends) == np.searchsorted(bad, seq_starts)
+        seq_lens = line_ends - seq_starts
+        for j, ch in enumerate(prefix):
+            keep &= seq_lens > j
+            keep &= view[np.minimum(seq_starts + j, len(view) - 1)] == ch
+
+        yield view, line_starts[keep], seq_starts[keep], seq_lens[keep]
@@ -0,0 +1,119 @@
+"""Read Simulation Module
+
+This module generates synthetic DNA storage data: random reference strands
+and noisy reads sequenced from them with substitution, insertion and
+deletion errors. Reads are tagged with the number of their reference and
+written in one of the input formats of Clover.
+
+Usage:
+    python -m clover.simulate -O reads.txt -N 10000 -C 10 -L 150
+
+"""
+
+import argparse
+
+import numpy as np
+
+BASES = np.frombuffer(b"ATGC", dtype=np.uint8)
+
+
+def random_strands(ref_nums, read_len, rng):
+    """Random reference strands as a (ref_nums, read_len) matrix of base codes."""
+    return rng.integers(0, 4, size=(ref_nums, read_len), dtype=np.uint8)
+
+
+def mutate(strands, sub_rate, ins_rate, del_rate, rng):
+    """Noisy copies of strands with random substitutions, insertions and deletions.
+
+    Every base is substituted by another base with probability sub_rate and
+    deleted with probability del_rate, and a random base is inserted before
+    it with probability ins_rate.
+
+    Args:
+        strands: numpy.ndarray,(reads, read_len) matrix of base codes.
+        sub_rate: float,Substitution rate per base.
+        ins_rate: float,Insertion rate per base.
+        del_rate: float,Deletion rate per base.
+        rng: numpy.random.Generator,Random generator.
+
+    Returns:
+        Returns a tuple with the base codes of all the reads as one stream
+        and the length of each read.
+    """
+    draws = rng.random((3,) + strands.shape)
+    reads = strands.copy()
+    substituted = draws[0] < sub_rate
+    # adding 1 to 3 modulo 4 always changes the base
+    reads[substituted] = (reads[substituted] + rng.integers(1, 4, size=int(substituted.sum()), dtype=np.uint8)) % 4
+    inserted = (draws[1] < ins_rate).reshape(-1)
+    kept = (draws[2] >= del_rate).reshape(-1)
+    # each position of a strand gives an optional inserted base followed by its own base if kept
+    sizes = inserted.astype(np.int64) + kept
+    starts = np.cumsum(sizes) - sizes
+    codes = np.empty(int(sizes.sum()), dtype=np.uint8)
+    codes[starts[inserted]] = rng.integers(0, 4, size=int(inserted.sum()), dtype=np.uint8)
+    codes[starts[kept] + inserted[kept]] = reads.reshape(-1)[kept]
+    return codes, sizes.reshape(strands.shape).sum(axis=1)
+
+
+def simulate_reads(ref_nums=1000, coverage=10, read_len=150, sub_rate=0.01, ins_rate=0.01, del_rate=0.01,
+                   seed=0, batch_size=10000):
+    """Simulate tagged reads of random reference strands.
+
+    Args:
+        ref_nums: int,Number of reference strands.
+        coverage: int,Number of reads of each reference.
+        read_len: int,Length of the reference strands.
+        sub_rate: float,Substitution rate per base.
+        ins_rate: float,Insertion rate per base.
+        del_rate: float,Deletion rate per base.
+        seed: int,Seed of the random generator, the same seed gives the same reads.
+        batch_size: int,Number of reads mutated at once.
+
+    Returns:
+        Returns the list of (tag, read) records in random order, the tag of
+        a read is the number of its reference.
+    """
+    rng = np.random.default_rng(seed)
+    strands = random_strands(ref_nums, read_len, rng)
+    refs = rng.permutation(np.repeat(np.arange(ref_nums), coverage))
+    records = []
+    for i in range(0, len(refs), batch_size):
+        batch = refs[i:i + batch_size]
+        codes, lengths = mutate(strands[batch], sub_rate, ins_rate, del_rate, rng)
+        seqs = BASES[codes].tobytes().decode()
+        ends = np.cumsum(lengths).tolist()
+        records += [(str(ref), seqs[end - length:end]) for ref, end, length in zip(batch.tolist(), ends, lengths.tolist())]
+    return records
+
+
+def write_reads(path, records, file_format="txt"):
+    """Write (tag, read) records as a txt, fasta or fastq file."""
+    with open(path, "w") as f:
+        for tag, read in records:
+            if file_format == "fasta":
+                f.write(">%s\n%s\n" % (tag, read))
+            elif file_format == "fastq":
+                f.write("@%s\n%s\n+\n%s\n" % (tag, read, "I" * len(read)))
+            else:
+                f.write("%s %s\n" % (tag, read))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m clover.simulate", description="Simulate noisy DNA storage reads.")
+    parser.add_argument("-O", dest="output", required=True, help="output file")
+    parser.add_argument("-N", dest="ref_nums", type=int, default=1000, help="number of reference strands")
+    parser.add_argument("-C", dest="coverage", type=int, default=10, help="reads per reference")
+    parser.add_argument("-L", dest="read_len", type=int, default=150, help="length of the reference strands")
+    parser.add_argument("--sub", type=float, default=0.01, help="substitution rate")
+    parser.add_argument("--ins", type=float, default=0.01, help="insertion rate")
+    parser.add_argument("--del", dest="dele", type=float, default=0.01, help="deletion rate")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--format", default="txt", choices=("txt", "fasta", "fastq"), help="output format")
+    args = parser.parse_args(argv)
+    records = simulate_reads(args.ref_nums, args.coverage, args.read_len, args.sub, args.ins, args.dele, args.seed)
+    write_reads(args.output, records, args.format)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+"""Packed Read Store Module
+
+This module provides a compact in-memory store for reads: bases are packed
+2 bits each in one contiguous NumPy buffer and reads and tags are located
+through offset arrays, instead of keeping one Python str per input line.
+
+"""
+
+import os
+import pickle
+
+import numpy as np
+
+BASE_CODE = {"A": 0, "T": 1, "G": 2, "C": 3}
+CODE_BASE = np.frombuffer(b"ATGC", dtype=np.uint8)
+
+INVALID = 255
+
+# ASCII code -> 2-bit base code, any other character is INVALID
+PACK_TABLE = np.full(256, INVALID, dtype=np.uint8)
+for _base, _code in BASE_CODE.items():
+    PACK_TABLE[ord(_base)] = _code
+
+
+def pack_codes(codes):
+    """Pack a stream of 2-bit base codes, 4 bases per byte."""
+    padded = np.zeros((len(codes) + 3) // 4 * 4, dtype=np.uint8)
+    padded[:len(codes)] = codes
+    quads = padded.reshape(-1, 4)
+    return quads[:, 0] | (quads[:, 1] << 2) | (quads[:, 2] << 4) | (quads[:, 3] << 6)
+
+
+def append_spill(path, reads):
+    """Append a store to a spill file, creating the file if needed."""
+    with open(path, "ab") as f:
+        pickle.dump(reads, f, pickle.HIGHEST_PROTOCOL)
+
+
+def iter_spill(path):
+    """Yield the stores of a spill file in the order they were appended.
+
+    Nothing is yielded if the file does not exist.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                break
+
+
+def csr_offsets(lengths):
+    """Offsets of consecutive items of the given lengths, with a leading 0."""
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+def encode_tags(tags):
+    """Encode tags into one UTF-8 byte string and the offset of each tag in it."""
+    tag_data = "".join(tags).encode()
+    if len(tag_data) == sum(map(len, tags)):
+        tag_lengths = np.fromiter(map(len, tags), dtype=np.int64, count=len(tags))
+    else:
+        tag_lengths = np.fromiter((len(tag.encode()) for tag in tags), dtype=np.int64, count=len(tags))
+    return tag_data, csr_offsets(tag_lengths)
+
+
+def decode_tags(tag_data, tag_offsets):
+    """Tags encoded by encode_tags."""
+    tag_offsets = np.asarray(tag_offsets).tolist()
+    return [tag_data[tag_offsets[i]:tag_offsets[i + 1]].decode() for i in range(len(tag_offsets) - 1)]
+
+
+class PackedReads:
+    """Packed Read Store Class
+
+    Reads are only made of A, T, G and C, reads containing other characters
+    are dropped when the store is built.
+
+    Attributes:
+        data: numpy.ndarray,uint8 buffer holding the 2-bit base codes.
+        offsets: numpy.ndarray,int64 base offset of each read in data, with
+            one more item marking the end of the last read.
+        tag_data: bytes,UTF-8 encoded tags of all the reads.
+        tag_offsets: numpy.ndarray,int64 offset of each tag in tag_data, with
+            one more item marking the end of the last tag.
+    """
+
+    __slots__ = ("data", "offsets", "tag_data", "tag_offsets")
+
+    def __init__(self, data, offsets, tag_data, tag_offsets):
+        self.data = data
+        self.offsets = offsets
+        self.tag_data = tag_data
+        self.tag_offsets = tag_offsets
+
+    @classmethod
+    def from_records(cls, records):
+        """Build a store from (tag, read) records."""
+        tags = [record[0] for record in records]
+        seqs = [record[1] for record in records]
+        lengths = np.fromiter(map(len, seqs), dtype=np.int64, count=len(seqs))
+        codes = PACK_TABLE[np.frombuffer("".join(seqs).encode("ascii", "replace"), dtype=np.uint8)]
+        bad = np.flatnonzero(codes == INVALID)
+        if len(bad):
+            offsets = csr_offsets(lengths)
+            valid = np.searchsorted(bad, offsets[:-1]) == np.searchsorted(bad, offsets[1:])
+            return cls.from_records([records[i] for i in np.flatnonzero(valid)])
+        return cls.from_codes(codes, lengths, tags)
+
+    @classmethod
+    def from_codes(cls, codes, lengths, tags):
+        """Build a store from a stream of base codes, read lengths and tags."""
+        tag_data, tag_offsets = encode_tags(tags)
+        return cls(pack_codes(codes), csr_offsets(lengths), tag_data, tag_offsets)
+
+    @classmethod
+    def concat(cls, stores):
+        """Concatenate several stores into one."""
+        codes = np.concatenate([store.codes() for store in stores])
+        lengths = np.concatenate([store.lengths() for store in stores])
+        tag_lengths = np.concatenate([np.diff(store.tag_offsets) for store in stores])
+        return cls(pack_codes(codes), csr_offsets(lengths),
+                   b"".join(store.tag_data for store in stores), csr_offsets(tag_lengths))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self):
+        """Memory used by the store in bytes."""
+        return self.data.nbytes + self.offsets.nbytes + len(self.tag_data) + self.tag_offsets.nbytes
+
+    def lengths(self):
+        """Length of each read."""
+        return np.diff(self.offsets)
+
+    def code_at(self, positions):
+        """Base codes at the given positions of the packed stream."""
+        return (self.data[positions >> 2] >> ((positions & 3) << 1).astype(np.uint8)) & 3
+
+    def codes(self):
+        """Base codes of all the reads as one unpacked stream."""
+        return self.code_at(np.arange(self.offsets[-1], dtype=np.int64))
+
+    def base_values(self, width):
+        """DUHI value of the first bases of each read.
+
+        Args:
+            width: int,Number of leading bases kept for each read.
+
+        Returns:
+            Returns a uint8 matrix of shape (len(self), width), positions past
+            the end of a read are 0.
+        """
+        cols = np.arange(width, dtype=np.int64)
+        positions = self.offsets[:-1, None] + cols
+        inside = positions < self.offsets[1:, None]
+        values = self.code_at(np.where(inside, positions, 0)) + 1
+        values[~inside] = 0
+        return values
+
+    def prefix_keys(self, length):
+        """Base-4 number made of the codes of the first bases of each read."""
+        values = self.base_values(length).astype(np.int64)
+        keys = np.zeros(len(self), dtype=np.int64)
+        for j in range(length):
+            keys = keys * 4 + np.maximum(values[:, j] - 1, 0)
+        return keys
+
+    def take(self, indices):
+        """Build a new store holding the given reads."""
+        indices = np.asarray(indices, dtype=np.int64)
+        lengths = self.lengths()[indices]
+        new_offsets = csr_offsets(lengths)
+        positions = np.arange(new_offsets[-1], dtype=np.int64) + np.repeat(self.offsets[indices] - new_offsets[:-1], lengths)
+        tag_lengths = np.diff(self.tag_offsets)[indices]
+        tag_offsets = self.tag_offsets.tolist()
+        tag_data = b"".join([self.tag_data[tag_offsets[i]:tag_offsets[i + 1]] for i in indices.tolist()])
+        return PackedReads(pack_codes(self.code_at(positions)), new_offsets, tag_data, csr_offsets(tag_lengths))
+
+    def tag(self, i):
+        """Tag of the i-th read."""
+        return self.tag_data[self.tag_offsets[i]:self.tag_offsets[i + 1]].decode()
+
+    def tags(self):
+        """Tags of all the reads."""
+        return decode_tags(self.tag_data, self.tag_offsets)
+
+    def seq(self, i):
+        """Sequence of the i-th read."""
+        positions = np.arange(self.offsets[i], self.offsets[i + 1], dtype=np.int64)
+        return CODE_BASE[self.code_at(positions)].tobytes().decode()
@@ -0,0 +1,187 @@
+"""Cluster Table Module
+
+This module stores the state of the clusters built by the hash engine as a
+struct of arrays: cluster sizes, representative fragment hashes, small
+fixed-size fragment histograms with their current top-1 value and the
+cluster of every clustered read.
+
+"""
+
+from array import array
+
+import numpy as np
+
+SLOT_NUMS = 2
+
+
+def cluster_members(read_cluster, cluster_nums, start=0):
+    """Reads of each cluster given the cluster of every read.
+
+    Args:
+        read_cluster: numpy.ndarray,Cluster of each read.
+        cluster_nums: int,Number of clusters.
+        start: int,Number of the first read included, earlier reads are
+            left out.
+
+    Returns:
+        Returns a list with, for each cluster in id order, the list of
+        its read numbers in read order.
+    """
+    read_cluster = np.asarray(read_cluster, dtype=np.int64)[start:]
+    order = np.argsort(read_cluster, kind="stable")
+    bounds = np.searchsorted(read_cluster[order], np.arange(cluster_nums + 1)).tolist()
+    order = (order + start).tolist()
+    return [order[bounds[i]:bounds[i + 1]] for i in range(cluster_nums)]
+
+
+class ClusterTable:
+    """Cluster Table Class
+
+    Clusters are numbered from 0 in creation order and reads in the order
+    they were clustered. The histogram of a fragment keeps its first
+    slot_nums distinct hash values inline, further values of a cluster go
+    to a small overflow dict, so counts are always exact. The most frequent
+    value of each histogram is maintained incrementally as counts change.
+
+    Attributes:
+        fragment_nums: int,Number of fragments of a read.
+        slot_nums: int,Number of histogram slots kept inline per fragment.
+        size: array,Number of reads of each cluster.
+        current: list,Representative hash of each cluster, one array per fragment.
+        slot_hash: list,Hash value of each histogram slot, one array per fragment.
+        slot_count: list,Count of each histogram slot, one array per fragment.
+        overflow: list,Dict per fragment mapping a cluster to the {hash: count}
+            values that did not fit in its slots.
+        top_hash: list,Most frequent hash of each cluster, one array per fragment.
+        top_count: list,Count of top_hash, one array per fragment.
+        read_cluster: array,Cluster of each clustered read.
+    """
+
+    __slots__ = ("fragment_nums", "slot_nums", "size", "current", "slot_hash",
+                 "slot_count", "overflow", "top_hash", "top_count", "read_cluster")
+
+    def __init__(self, fragment_nums=3, slot_nums=SLOT_NUMS):
+        self.fragment_nums = fragment_nums
+        self.slot_nums = slot_nums
+        self.size = array("I")
+        self.current = [array("I") for _ in range(fragment_nums)]
+        self.slot_hash = [array("I") for _ in range(fragment_nums)]
+        self.slot_count = [array("I") for _ in range(fragment_nums)]
+        self.overflow = [{} for _ in range(fragment_nums)]
+        self.top_hash = [array("I") for _ in range(fragment_nums)]
+        self.top_count = [array("I") for _ in range(fragment_nums)]
+        self.read_cluster = array("l")
+
+    def __len__(self):
+        return len(self.size)
+
+    def new_cluster(self, hashes):
+        """Open a cluster whose representative is the given fragment hashes.
+
+        Args:
+            hashes: tuple,Hash of each fragment.
+
+        Returns:
+            Returns the id of the new cluster.
+        """
+        idx = len(self.size)
+        self.size.append(0)
+        empty = [0] * (self.slot_nums - 1)
+        for f, hash_val in enumerate(hashes):
+            self.current[f].append(hash_val)
+            self.slot_hash[f].append(hash_val)
+            self.slot_hash[f].extend(empty)
+            self.slot_count[f].append(0)
+            self.slot_count[f].extend(empty)
+            self.top_hash[f].append(hash_val)
+            self.top_count[f].append(0)
+        return idx
+
+    def add_read(self, idx, hashes):
+        """Add a read to a cluster and count its fragment hashes.
+
+        Args:
+            idx: int,Cluster id.
+            hashes: tuple,Hash of each fragment of the read.
+
+        Returns:
+            Returns the new size of the cluster.
+        """
+        self.read_cluster.append(idx)
+        self.size[idx] += 1
+        base = idx * self.slot_nums
+        for f, hash_val in enumerate(hashes):
+            slot_hash = self.slot_hash[f]
+            slot_count = self.slot_count[f]
+            for j in range(base, base + self.slot_nums):
+                if slot_count[j] == 0:
+                    slot_hash[j] = hash_val
+                    count = slot_count[j] = 1
+                    break
+                if slot_hash[j] == hash_val:
+                    count = slot_count[j] = slot_count[j] + 1
+                    break
+            else:
+                counts = self.overflow[f].setdefault(idx, {})
+                count = counts[hash_val] = counts.get(hash_val, 0) + 1
+            # Counts only grow by one, so comparing with the current top keeps it exact
+            top_count = self.top_count[f]
+            if count > top_count[idx] or (count == top_count[idx] and hash_val > self.top_hash[f][idx]):
+                top_count[idx] = count
+                self.top_hash[f][idx] = hash_val
+        return self.size[idx]
+
+    def histogram(self, idx, f):
+        """Hash value counts of a fragment of a cluster as a dict."""
+        base = idx * self.slot_nums
+        counts = {}
+        for j in range(base, base + self.slot_nums):
+            if self.slot_count[f][j]:
+                counts[self.slot_hash[f][j]] = self.slot_count[f][j]
+        counts.update(self.overflow[f].get(idx, {}))
+        return counts
+
+    def most_common(self, idx, f):
+        """Most frequent hash value of a fragment of a cluster, the largest one on ties."""
+        return self.top_hash[f][idx]
+
+    def representatives(self):
+        """Representative hashes of all the clusters as a (clusters, fragments) int64 matrix."""
+        return np.array([np.array(current, dtype=np.int64) for current in self.current]).T.reshape(len(self), self.fragment_nums)
+
+    def members(self, start=0):
+        """Reads of each cluster.
+
+        Args:
+            start: int,Number of the first read included, earlier reads are
+                left out.
+
+        Returns:
+            Returns a list with, for each cluster in id order, the list of
+            its read numbers in clustering order.
+        """
+        return cluster_members(self.read_cluster, len(self), start)
+
+    def to_arrays(self):
+        """State of the table as a dict of int64 arrays, see from_arrays."""
+        overflow = [(f, idx, hash_val, count) for f in range(self.fragment_nums)
+                    for idx, counts in self.overflow[f].items() for hash_val, count in counts.items()]
+        arrays = {"size": self.size, "read_cluster": self.read_cluster}
+        for name in ("current", "slot_hash", "slot_count", "top_hash", "top_count"):
+            arrays[name] = np.array([np.array(column, dtype=np.int64) for column in getattr(self, name)]).reshape(self.fragment_nums, -1)
+        arrays = {name: np.asarray(value, dtype=np.int64) for name, value in arrays.items()}
+        arrays["overflow"] = np.array(overflow, dtype=np.int64).reshape(-1, 4)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays, slot_nums=SLOT_NUMS):
+        """Rebuild a table saved by to_arrays."""
+        table = cls(len(arrays["current"]), slot_nums)
+        table.size.fromlist(arrays["size"].tolist())
+        table.read_cluster.fromlist(arrays["read_cluster"].tolist())
+        for name in ("current", "slot_hash", "slot_count", "top_hash", "top_count"):
+            for column, values in zip(getattr(table, name), arrays[name]):
+                column.fromlist(values.tolist())
+        for f, idx, hash_val, count in arrays["overflow"].tolist():
+            table.overflow[f].setdefault(idx, {})[hash_val] = count
+        return table
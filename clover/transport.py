@@ -0,0 +1,114 @@
+"""Result Transport Module
+
+This module moves the results of a process to the main process. Scalars are
+sent as they are, while arrays and lists of tags are copied into a single
+multiprocessing.shared_memory block, so only the name and layout of the
+block go through the result queue instead of pickled lists.
+
+"""
+
+import os
+import secrets
+import traceback
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from clover import store as rs
+
+SHM_KEY = "shared_memory"
+
+ERROR_KEY = "error"
+
+ALIGN = 8
+
+
+def is_shared(value):
+    """Whether a num_dict value is moved to shared memory."""
+    return isinstance(value, (list, np.ndarray))
+
+
+def publish(num_dict):
+    """Move the arrays and tag lists of a num_dict to a shared memory block.
+
+    The block is left for the receiving process, which frees it. Lists are
+    expected to hold tags (str).
+
+    Args:
+        num_dict: dict,Results of a process.
+
+    Returns:
+        Returns a dict with the other values of num_dict and, under SHM_KEY,
+        the name and layout of the block. num_dict is returned unchanged if
+        it holds nothing to share.
+    """
+    arrays = []
+    layout = []
+    for key, value in num_dict.items():
+        if isinstance(value, list):
+            tag_data, tag_offsets = rs.encode_tags(value)
+            layout.append((key, "tags", len(arrays)))
+            arrays += [np.frombuffer(tag_data, dtype=np.uint8), tag_offsets]
+        elif isinstance(value, np.ndarray):
+            layout.append((key, "array", len(arrays)))
+            arrays.append(np.ascontiguousarray(value))
+    if not arrays:
+        return num_dict
+
+    specs = []
+    offset = 0
+    for array in arrays:
+        specs.append((array.dtype.str, array.shape, offset))
+        offset += -(-array.nbytes // ALIGN) * ALIGN
+    name = "clover_%d_%s" % (os.getpid(), secrets.token_hex(8))
+    shm = shared_memory.SharedMemory(name=name, create=True, size=max(offset, 1))
+    for array, (dtype, shape, start) in zip(arrays, specs):
+        np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=start)[...] = array
+    if os.name == "posix":
+        # The receiving process owns the block, do not let this process' tracker remove it at exit
+        resource_tracker.unregister("/" + name, "shared_memory")
+    shm.close()
+
+    results = {key: value for key, value in num_dict.items() if not is_shared(value)}
+    results[SHM_KEY] = (name, layout, specs)
+    return results
+
+
+def failure(name, error):
+    """Results reporting that the process called name failed with error."""
+    return {ERROR_KEY: (name, "".join(traceback.format_exception(type(error), error, error.__traceback__)))}
+
+
+def receive(results):
+    """Rebuild a num_dict sent by publish and free its shared memory block.
+
+    Args:
+        results: dict,Results returned by publish.
+
+    Returns:
+        Returns the num_dict, arrays are copied out of the block and tag
+        lists decoded.
+
+    Raises:
+        RuntimeError: The results are a failure report of the process.
+    """
+    if ERROR_KEY in results:
+        name, trace = results[ERROR_KEY]
+        raise RuntimeError("Process %s failed:\n%s" % (name, trace))
+    if SHM_KEY not in results:
+        return results
+    num_dict = dict(results)
+    name, layout, specs = num_dict.pop(SHM_KEY)
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        arrays = [np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=start).copy()
+                  for dtype, shape, start in specs]
+    finally:
+        shm.close()
+        shm.unlink()
+    for key, kind, i in layout:
+        if kind == "tags":
+            num_dict[key] = rs.decode_tags(arrays[i].tobytes(), arrays[i + 1])
+        else:
+            num_dict[key] = arrays[i]
+    return num_dict
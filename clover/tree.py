@@ -3,8 +3,17 @@
 This module provides retrieval algorithms based on tree structures, 
 including fuzzy search algorithms that allow for horizontal drift.
 
+Trie allocates an object for each node, FlatTrie stores the same tree in
+flat arrays for large runs.
+
 """
 
+from array import array
+from collections import deque
+
+BASE_CODE = {"A":0,"T":1,"G":2,"C":3}
+BASE_LETTER = {code: base for base, code in BASE_CODE.items()}
+
 class Trie:
     """Tree Structure Class
 
@@ -12,7 +21,7 @@ class Trie:
     need to additionally specify the depth of the tree.
 
     Attributes:
-        dna_dict: dict,The elements contained in the sequence.
+        dna_dict: dict,The elements contained in the sequence, BASE_CODE shared by all nodes.
         node_nums: int,The number of elements contained in the sequence.
         children: int,Number of tree branches.
         isEnd: int,The value to determine if the tree is terminated.
@@ -20,7 +29,7 @@ class Trie:
     """
 
     def __init__(self):
-        self.dna_dict = {"A":0,"T":1,"G":2,"C":3}
+        self.dna_dict = BASE_CODE
         self.node_nums = len(self.dna_dict)
         self.children = [None] * self.node_nums
         self.isEnd = False
@@ -127,6 +136,10 @@ class Trie:
     def fuzz_fin(self,word,max_value):
         """Fuzzy search with horizontal drift.
 
+        Breadth-first search over the substitutions proposed by fuzz_align,
+        which stops as soon as no sequence left in the queue can have fewer
+        drifts than the best match found.
+
         Args:
             word: str,Sequence of search
             max_value: int,The maximum number of horizontal drifts.
@@ -135,41 +148,114 @@ class Trie:
             Returns a list, the first element of which is the index of the final matched 
             core sequence, and the second element is the number of horizontal drifts.
         """
-
-        list=[[word,0]]
-        
         fin_list=["",1000]
-        dict2  = {}
-        for key in self.dna_dict:
-            dict2[self.dna_dict[key]] = key
-        error_list=[]
-        while True :
-            if list == [] or fin_list[1] == 0 :
-
-                break
-            dna = list[0]
-            
-            if dna[1] > max_value :
+        queue = deque([(word,0)])
+        while queue :
+            dna, drifts = queue.popleft()
+            if drifts > max_value or drifts >= fin_list[1] :
                 break
-            del list[0]
-            a = self.fuzz_align(dna[0])
-            error_list.append([dna,a])
+            a = self.fuzz_align(dna)
             if type(a) == int :
-                if dna[1] < fin_list[1] :
-                    fin_list=[a,dna[1]]
-            elif self.fuzz_align(word)[1] == [] :
-                break
-            elif a[0] == len(dna[0])-1:
-                for i in range(len(a[1])):
-                    i=a[1][i]
-                    k = dna[0][:a[0]]+dict2[i]
-                    list.append([k,dna[1]+1])                
-            else:
-                for i in range(len(a[1])):
-                    i=a[1][i]
-                    k = dna[0][:a[0]]+dict2[i]+dna[0][a[0]-len(dna[0])+1:]
-                    list.append([k,dna[1]+1])
-        fin_list.append(error_list)
-        return fin_list[:2]
-    
+                fin_list=[a,drifts]
+            elif type(a) == list :
+                num = a[0]
+                for i in a[1]:
+                    queue.append((dna[:num]+BASE_LETTER[i]+dna[num+1:],drifts+1))
+        return fin_list
+
+
+class FlatTrie:
+    """Flat Tree Structure Class
+
+    Trie stored in parallel arrays instead of one object per node, with the
+    same insert, searchPrefix, delete, fuzz_align and fuzz_fin results.
+    Node 0 is the root, the children of node n are the entries 4 * n to
+    4 * n + 3 of children, 0 meaning no child.
+
+    Attributes:
+        dna_dict: dict,Code of each base, shared by all trees.
+        node_nums: int,Number of tree branches.
+        children: array,Child node of each node and base.
+        isEnd: list,Label of each node, False if no branch ends on it.
+
+    """
+
+    def __init__(self):
+        self.dna_dict = BASE_CODE
+        self.node_nums = len(self.dna_dict)
+        self.children = array("i", [0] * self.node_nums)
+        self.isEnd = [False]
+
+    def __len__(self):
+        """Number of nodes, including the root."""
+        return len(self.isEnd)
+
+    def child(self, node, ch):
+        """Child node of a node for a base code, 0 if there is none."""
+        return self.children[node * self.node_nums + ch]
+
+    def walk(self, word, create=False):
+        """Node reached by a sequence, None if it leaves the tree.
+
+        Args:
+            word: str,Sequence followed from the root.
+            create: bool,Add the missing nodes instead of returning None.
+
+        """
+        children = self.children
+        dict = self.dna_dict
+        node_nums = self.node_nums
+        node = 0
+        for ch in word:
+            slot = node * node_nums + dict[ch]
+            node = children[slot]
+            if not node:
+                if not create:
+                    return None
+                node = len(self.isEnd)
+                children[slot] = node
+                children.extend([0] * node_nums)
+                self.isEnd.append(False)
+        return node
+
+    #Node retrieval function without drift.
+    def searchPrefix(self, prefix: str):
+        node = self.walk(prefix)
+        if node is None:
+            return None
+        return self.isEnd[node]
+
+    def insert(self, word: str,label:str) -> None:
+        """Add a branch to the tree, see Trie.insert."""
+        self.isEnd[self.walk(word, True)] = label
+
+    def delete(self,word:str):
+        """Deletes a branch from the tree, see Trie.delete."""
+        self.isEnd[self.walk(word, True)] = False
+
+    def fuzz_align(self,word):
+        """Horizontal drift function, see Trie.fuzz_align."""
+        child = self.child
+        dict = self.dna_dict
+        node = 0
+        len_=len(word)
+        for num, ch in enumerate(word):
+            next_node = child(node, dict[ch])
+            if next_node:
+                node = next_node
+                continue
+            branches = [i for i in range(self.node_nums) if child(node, i)]
+            if num + 2 < len_ :
+                fin_list = []
+                for k in branches :
+                    second = child(child(node, k), dict[word[num+1]])
+                    if second and child(second, dict[word[num+2]]):
+                        fin_list.append(k)
+                return [num,fin_list]
+            if num + 2 == len_ :
+                return [num,[k for k in branches if child(child(node, k), dict[word[num+1]])]]
+            if branches :
+                return [num,branches[:1]]
+        return self.isEnd[node]
 
+    fuzz_fin = Trie.fuzz_fin
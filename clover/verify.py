@@ -0,0 +1,153 @@
+"""Cluster Verification Module
+
+This module checks the clusters built by the hash engine against the
+sequences of their reads. A read joins a cluster when a few of its
+fragments match, so a chimeric read or a hash collision can put it in the
+wrong cluster. Every read is compared with a representative of its cluster
+by edit distance, and the reads that are too far from it are split into
+new clusters of their own.
+
+"""
+
+import contextlib
+import multiprocessing
+
+import numpy as np
+
+from clover import align as al
+from clover import table as tb
+
+PAIR_BLOCK = 4096
+
+
+def distances(read_1s, read_2s, max_distance, pool=None):
+    """Edit distances of pairs of sequences, bounded by max_distance.
+
+    Pairs whose lengths differ by more than max_distance are not aligned
+    and get max_distance + 1. With a pool, the others are handed to its
+    workers in blocks of PAIR_BLOCK pairs.
+
+    Args:
+        read_1s: list,First sequence of each pair.
+        read_2s: list,Second sequence of each pair.
+        max_distance: int,Largest distance of interest.
+        pool: multiprocessing.pool.Pool,Workers aligning the pairs, None
+            to align them in this process.
+
+    Returns:
+        Returns an int64 array of the distance of each pair, any distance
+        larger than max_distance is reported as max_distance + 1 or more.
+    """
+    result = np.full(len(read_1s), max_distance + 1, dtype=np.int64)
+    close = [k for k, (read_1, read_2) in enumerate(zip(read_1s, read_2s)) if abs(len(read_1) - len(read_2)) <= max_distance]
+    pairs_1 = [read_1s[k] for k in close]
+    pairs_2 = [read_2s[k] for k in close]
+    if pool is not None and len(close) > PAIR_BLOCK:
+        parts = pool.starmap(al.pair_distances, [(pairs_1[k:k + PAIR_BLOCK], pairs_2[k:k + PAIR_BLOCK])
+                                                 for k in range(0, len(close), PAIR_BLOCK)])
+        result[close] = np.concatenate(parts)
+    elif close:
+        result[close] = al.pair_distances(pairs_1, pairs_2)
+    return result
+
+
+def representatives(members, seqs, max_distance, sample_nums=5, pool=None):
+    """Representative read of each cluster.
+
+    The representative is the medoid of the first sample_nums reads of the
+    cluster: the one with the smallest sum of distances to the others.
+
+    Args:
+        members: list,Read numbers of each cluster, as given by table.cluster_members.
+        seqs: list,Sequence of each read.
+        max_distance: int,Distance bound, see distances.
+        sample_nums: int,Number of reads of a cluster considered.
+        pool: multiprocessing.pool.Pool,Workers aligning the reads, see distances.
+
+    Returns:
+        Returns the list of the read number of the representative of each
+        cluster, None for an empty cluster.
+    """
+    reps = [reads[0] if reads else None for reads in members]
+    pairs = [(c, a, b) for c, reads in enumerate(members) if len(reads) > 2
+             for i, a in enumerate(reads[:sample_nums]) for b in reads[i + 1:sample_nums]]
+    if not pairs:
+        return reps
+    pair_distances = distances([seqs[a] for c, a, b in pairs], [seqs[b] for c, a, b in pairs], max_distance, pool).tolist()
+    totals = {}
+    for (c, a, b), distance in zip(pairs, pair_distances):
+        totals[c, a] = totals.get((c, a), 0) + distance
+        totals[c, b] = totals.get((c, b), 0) + distance
+    for c, reads in enumerate(members):
+        if len(reads) > 2:
+            reps[c] = min(reads[:sample_nums], key=lambda read: totals[c, read])
+    return reps
+
+
+def split_clusters(seqs, read_cluster, cluster_nums, max_distance, jobs=1, sample_nums=5):
+    """Split the reads of each cluster that are too far from its representative.
+
+    The reads of a cluster at an edit distance larger than max_distance
+    from its representative are grouped again, greedily: in read order,
+    a read joins the first new cluster whose leader is within max_distance
+    of it, or opens a new cluster as its leader. Each round takes the
+    first reads left in a group as candidate leaders, twice as many as in
+    the previous round, and aligns them with each other and with the
+    later reads at once, so a group of g reads far from each other takes
+    about log2(g) rounds. All the clusters are handled together in each
+    round.
+
+    Args:
+        seqs: list,Sequence of each read.
+        read_cluster: numpy.ndarray,Cluster of each read.
+        cluster_nums: int,Number of clusters.
+        max_distance: int,Largest edit distance of a read to the representative of its cluster.
+        jobs: int,Number of worker processes aligning the reads, a single
+            pool is used for the whole call. Inside a daemonic process the
+            reads are aligned in it.
+        sample_nums: int,Number of reads a representative is chosen from.
+
+    Returns:
+        Returns a tuple with the int64 array of the cluster of each read,
+        the split clusters being numbered from cluster_nums on, and the new
+        number of clusters.
+    """
+    read_cluster = np.array(read_cluster, dtype=np.int64)
+    use_pool = jobs > 1 and not multiprocessing.current_process().daemon
+    with (multiprocessing.Pool(jobs) if use_pool else contextlib.nullcontext()) as pool:
+        members = tb.cluster_members(read_cluster, cluster_nums)
+        reps = representatives(members, seqs, max_distance, sample_nums, pool)
+        reads = [read for c in range(cluster_nums) if len(members[c]) > 1 for read in members[c] if read != reps[c]]
+        rep_distances = distances([seqs[reps[read_cluster[read]]] for read in reads], [seqs[read] for read in reads],
+                                  max_distance, pool)
+        outliers = {}
+        for read, distance in zip(reads, rep_distances.tolist()):
+            if distance > max_distance:
+                outliers.setdefault(read_cluster[read], []).append(read)
+        new_cluster = cluster_nums
+        remaining = list(outliers.values())
+        leader_nums = 1
+        while remaining:
+            # every candidate leader against the reads after it in its group
+            pairs = [(a, b) for group in remaining for i, a in enumerate(group[:leader_nums]) for b in group[i + 1:]]
+            pair_distances = distances([seqs[a] for a, b in pairs], [seqs[b] for a, b in pairs], max_distance, pool).tolist()
+            near = {pair for pair, distance in zip(pairs, pair_distances) if distance <= max_distance}
+            left_groups = []
+            for group in remaining:
+                leaders = []
+                left = []
+                for k, read in enumerate(group):
+                    leader = next((leader for leader in leaders if (leader, read) in near), None)
+                    if leader is not None:
+                        read_cluster[read] = read_cluster[leader]
+                    elif k < leader_nums:
+                        leaders.append(read)
+                        read_cluster[read] = new_cluster
+                        new_cluster += 1
+                    else:
+                        left.append(read)
+                if left:
+                    left_groups.append(left)
+            remaining = left_groups
+            leader_nums *= 2
+    return read_cluster, new_cluster
@@ -13,3 +13,35 @@ class TestGlobalAlign(unittest.TestCase):
         self.assertEqual([(1,"T")],align.global_align(self.example_read_1,self.example_read_2))
 
 
+
+class TestMyersAlign(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.core_read = "ACGTACGTAC"
+        self.reads = ["ACGTACGTAC","ACCTACGTAA","ACGACGTAC","ACGTTACGTAC","TACGTACGTAC"]
+
+    def test_edit_distance(self):
+        self.assertEqual([align.edit_distance(self.core_read,read) for read in self.reads],[0,2,1,1,1])
+        self.assertEqual(align.edit_distance("","ACG"),3)
+
+    def test_myers_align(self):
+        self.assertEqual(align.myers_align(self.core_read,self.reads[1]),align.global_align(self.core_read,self.reads[1]))
+        self.assertEqual(align.myers_align(self.core_read,self.reads[2]),[(3,"")])
+        self.assertEqual(align.myers_align(self.core_read,self.reads[3]),[(3,"TT")])
+        self.assertEqual(align.myers_align(self.core_read,self.reads[4]),[(0,"TA")])
+        self.assertIsNone(align.myers_align(self.core_read,self.reads[1],band=1))
+
+    def test_batch_align(self):
+        errors = align.batch_align(self.core_read,self.reads)
+        self.assertEqual(errors,[align.myers_align(self.core_read,read) for read in self.reads])
+        for read, error_list in zip(self.reads,errors):
+            bases = list(self.core_read)
+            for position, base in error_list:
+                bases[position] = base
+            self.assertEqual("".join(bases),read)
+
+    def test_pair_distances(self):
+        read_2s = self.reads + ["", "A" * 70, "ACGT" * 20]
+        read_1s = [self.core_read] * len(self.reads) + ["ACG", "A" * 68 + "C", "ACGT" * 19 + "ACCT"]
+        expected = [align.edit_distance(read_1, read_2) for read_1, read_2 in zip(read_1s, read_2s)]
+        self.assertEqual(align.pair_distances(read_1s, read_2s, block_size=3).tolist(), expected)
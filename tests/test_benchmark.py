@@ -0,0 +1,24 @@
+import os
+import tempfile
+import unittest
+
+from clover import benchmark
+from clover import simulate
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "reads.txt")
+        simulate.write_reads(self.path, simulate.simulate_reads(20, 5, 152, 0, 0, 0, seed=3))
+
+    def tearDown(self) -> None:
+        self.dir.cleanup()
+
+    def test_run_benchmark(self):
+        report = benchmark.run_benchmark(self.path, 152, tag_nums=20)
+        self.assertEqual(report["reads"], 100)
+        self.assertEqual(set(report["stages"]), {"parse", "hash", "cluster", "index", "output", "evaluate"})
+        self.assertEqual(report["statistics"]["accuracy"], 1.0)
+        self.assertEqual(report["statistics"]["clusters"], 20)
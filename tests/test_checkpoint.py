@@ -0,0 +1,104 @@
+import tempfile
+import unittest
+
+from clover import checkpoint
+from clover import load_config
+from clover import main
+from clover import simulate
+from clover import store
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        records = simulate.simulate_reads(30, 6, 152, seed=5)
+        self.chunks = [store.PackedReads.from_records(records[i:i + 40]) for i in range(0, len(records), 40)]
+
+    def tearDown(self) -> None:
+        self.dir.cleanup()
+
+    def new_process(self):
+        process = main.MyProcess("all", [], None, load_config.default_config())
+        process.checkpoint_dir = self.dir.name
+        process.checkpoint_interval = 0
+        return process
+
+    def test_resume(self):
+        full = self.new_process()
+        full.checkpoint_dir = ""
+        for chunk in full.resume_chunks(self.chunks):
+            full.cluster_batch(chunk)
+
+        # clusters the first chunks then stops, as if the run had been interrupted
+        interrupted = self.new_process()
+        for chunk in interrupted.resume_chunks(self.chunks[:3]):
+            interrupted.cluster_batch(chunk)
+
+        resumed = self.new_process()
+        resumed.restore_checkpoint()
+        self.assertEqual(resumed.consumed, 120)
+        for chunk in resumed.resume_chunks(self.chunks):
+            resumed.cluster_batch(chunk)
+        self.assertEqual(resumed.cluster_tags(), full.cluster_tags())
+        self.assertEqual(list(resumed.cluster_table.read_cluster), list(full.cluster_table.read_cluster))
+
+    def test_mmap_rejected(self):
+        path = self.dir.name + "/reads.txt"
+        simulate.write_reads(path, simulate.simulate_reads(2, 2, 152, seed=5))
+        config = load_config.default_config({"input_path": path, "read_len": 152, "mmap_mode": True,
+                                             "checkpoint_dir": self.dir.name})
+        with self.assertRaises(ValueError):
+            main.run_clover(config)
+
+    def test_resume_other_partitions(self):
+        path = self.dir.name + "/reads.txt"
+        simulate.write_reads(path, simulate.simulate_reads(2, 2, 152, seed=5))
+        # snapshots of an interrupted run with a single process
+        checkpoint.record_partitions(self.dir.name, ["all"])
+        config = load_config.default_config({"input_path": path, "read_len": 152, "processes_nums": 1,
+                                             "checkpoint_dir": self.dir.name, "resume_mode": True})
+        with self.assertRaises(ValueError):
+            main.run_clover(config)
+
+    def test_skip_inside_chunk(self):
+        interrupted = self.new_process()
+        for chunk in interrupted.resume_chunks(self.chunks[:1]):
+            interrupted.cluster_batch(chunk)
+        resumed = self.new_process()
+        resumed.restore_checkpoint()
+        reads = store.PackedReads.concat(self.chunks)
+        rechunked = [reads.take(range(i, min(i + 25, len(reads)))) for i in range(0, len(reads), 25)]
+        for chunk in resumed.resume_chunks(rechunked):
+            resumed.cluster_batch(chunk)
+        self.assertEqual(resumed.consumed, len(reads))
+        self.assertEqual(resumed.read_tags, reads.tags())
+
+
+class TestState(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = self.dir.name + "/all.npz"
+        records = simulate.simulate_reads(30, 6, 152, seed=6)
+        self.batches = [store.PackedReads.from_records(records[:100]), store.PackedReads.from_records(records[100:])]
+
+    def tearDown(self) -> None:
+        self.dir.cleanup()
+
+    def test_add_reads(self):
+        full = main.MyProcess("all", [], None, load_config.default_config())
+        for batch in self.batches:
+            full.cluster_batch(batch)
+
+        first = main.MyProcess("all", [], None, load_config.default_config())
+        first.cluster_batch(self.batches[0])
+        first.save_state(self.path)
+
+        second = main.MyProcess("all", [], None, load_config.default_config())
+        second.restore_state(self.path)
+        self.assertEqual(second.first_read, len(first.read_tags))
+        second.cluster_batch(self.batches[1])
+        self.assertEqual(list(second.cluster_table.read_cluster), list(full.cluster_table.read_cluster))
+        # only the reads of the second batch are reported, in the clusters they joined
+        self.assertEqual(second.cluster_tags(second.first_read), full.cluster_tags(len(first.read_tags)))
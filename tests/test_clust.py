@@ -1,23 +1,105 @@
+import os
+import tempfile
 import unittest
 
+from clover import load_config
 from clover import main
+from clover import simulate
 
 class TestClust(unittest.TestCase):
 
     def setUp(self) -> None:
-        self.example_process = main.MyProcess("test",[],[])
-        self.example_process.now_clust_threshold = 0
-        self.example_process.read_len = 6
-        self.example_process.dna_tree_nums = 4
-        self.example_process.fuzz_list = [1,1,4]
-        self.example_process.loc_nums = [0]
-        self.example_process.fuzz_tree_nums = 1
-        self.example_process.config_dict['read_len_min'] = 4
+        self.example_process = main.MyProcess("test",[],[],load_config.default_config({"read_len": 6, "read_len_min": 4}))
 
 
     def test_global_align(self):
         self.example_process.cluster("1 AAAAAA")
         self.example_process.cluster("2 AAAAAA")
-        cluster_result = self.example_process.ref_dict[1]
-        self.assertEqual(cluster_result,["1","2"])
+        self.example_process.cluster("3 CCCCCC")
+        cluster_result = self.example_process.cluster_tags()
+        self.assertEqual(cluster_result,[["1","2"],["3"]])
+        self.assertEqual(list(self.example_process.cluster_table.read_cluster),[0,0,1])
 
+
+class TestClusterReads(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.records = simulate.simulate_reads(20, 5, 152, seed=4)
+
+    def tearDown(self) -> None:
+        self.dir.cleanup()
+
+    def test_records_and_path(self):
+        clusters, tags = main.cluster_reads(self.records, {"read_len": 152, "batch_size": 30})
+        self.assertEqual(len(clusters), len(tags))
+        self.assertEqual(tags, [tag for tag, read in self.records if len(read) >= 147])
+        path = os.path.join(self.dir.name, "reads.txt")
+        simulate.write_reads(path, self.records)
+        path_clusters, path_tags = main.cluster_reads(path, {"read_len": 152})
+        self.assertEqual(path_clusters.tolist(), clusters.tolist())
+        self.assertEqual(path_tags, tags)
+
+    def test_reads_and_state(self):
+        reads = [read for tag, read in self.records]
+        clusters, tags = main.cluster_reads(reads, {"read_len": 152})
+        self.assertEqual(tags[0], "0")
+        config = {"read_len": 152, "state_dir": self.dir.name}
+        first, _ = main.cluster_reads(reads[:50], config)
+        second, second_tags = main.cluster_reads(reads[50:], config)
+        self.assertEqual(first.tolist() + second.tolist(), clusters.tolist())
+        self.assertEqual(second_tags[0], "0")
+
+    def test_sketch(self):
+        records = simulate.simulate_reads(20, 5, 152, 0, 0, 0, seed=4)
+        clusters, tags = main.cluster_reads(records, {"read_len": 152, "sketch_nums": 6, "match_nums": 3,
+                                                      "sketch_window": 3, "fragment_len": 10})
+        self.assertEqual(len(set(zip(clusters.tolist(), tags))), 20)
+        self.assertEqual(clusters.max() + 1, 20)
+
+    def test_mmap_like_stream(self):
+        records = list(self.records[:12])
+        records[1] = ("NODE_1", records[1][1])
+        records[4] = (records[4][0], records[4][1][:20] + "a" + records[4][1][21:])
+        records[6] = (records[6][0], records[6][1][:20] + "N" + records[6][1][21:])
+        path = os.path.join(self.dir.name, "reads.txt")
+        simulate.write_reads(path, records)
+        outputs = []
+        for mmap_mode in (False, True):
+            output_file = os.path.join(self.dir.name, "out%d.txt" % mmap_mode)
+            main.run_clover(load_config.default_config({"input_path": path, "read_len": 152, "output_file": output_file,
+                                                        "mmap_mode": mmap_mode, "Virtual_mode": False}))
+            with open(output_file) as f:
+                outputs.append(f.read())
+        self.assertEqual(outputs[1], outputs[0])
+        self.assertIn("NODE_1", outputs[0])
+
+    def test_missing_input(self):
+        config = load_config.default_config({"read_len": 152, "input_path": os.path.join(self.dir.name, "missing.txt")})
+        with self.assertRaises(FileNotFoundError):
+            main.run_clover(config)
+
+    def test_unknown_entry(self):
+        with self.assertRaises(ValueError):
+            main.cluster_reads(self.records, {"read_length": 152})
+
+    def test_drift(self):
+        records = simulate.simulate_reads(1, 2, 152, 0, 0, 0, seed=4)
+        # a base inserted near the read start shifts all of its fragments
+        records.append(("0", "A" + records[0][1][:-1]))
+        clusters, tags = main.cluster_reads(records, {"read_len": 152})
+        self.assertEqual(clusters.tolist(), [0, 0, 1])
+        clusters, tags = main.cluster_reads(records, {"read_len": 152, "drift_mode": True})
+        self.assertEqual(clusters.tolist(), [0, 0, 0])
+        process = main.MyProcess("all", [], None, load_config.default_config({"read_len": 152, "drift_mode": True,
+                                                                              "profile_mode": True}))
+        process.cluster_batch(records)
+        counters = process.profiler.report()["counters"]
+        self.assertEqual((counters["new_clusters"], counters["joins"], counters["drift_joins"]), (1, 2, 1))
+
+    def test_verify(self):
+        clusters, tags = main.cluster_reads(self.records, {"read_len": 152, "verify_mode": True})
+        self.assertEqual(len(set(zip(clusters.tolist(), tags))), clusters.max() + 1)
+        self.assertEqual(len(clusters), len(tags))
+        with self.assertRaises(ValueError):
+            main.cluster_reads(self.records, {"read_len": 152, "verify_mode": True, "state_dir": self.dir.name})
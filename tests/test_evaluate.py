@@ -0,0 +1,33 @@
+import unittest
+
+from clover import evaluate
+
+
+class TestEvaluate(unittest.TestCase):
+
+    def setUp(self) -> None:
+        # cluster 0: a a b, cluster 1: c c, cluster 2: a
+        self.read_cluster = [0, 1, 0, 0, 1, 2]
+        self.read_tags = ["a", "c", "a", "b", "c", "a"]
+
+    def test_clover_statistics(self):
+        stats = evaluate.evaluate(self.read_cluster, self.read_tags, tag_nums=3)
+        self.assertEqual(stats["counted_reads"], 5)
+        self.assertEqual(stats["errors"], 1)
+        self.assertEqual(stats["clusters"], 2)
+        self.assertAlmostEqual(stats["accuracy"], 0.8)
+        self.assertAlmostEqual(stats["coverage"], 2 / 3)
+        self.assertAlmostEqual(stats["redundancy"], -1 / 3)
+        self.assertEqual(stats["size_histogram"], [0, 1, 1, 1])
+
+    def test_purity_ari(self):
+        stats = evaluate.evaluate(self.read_cluster, self.read_tags)
+        self.assertAlmostEqual(stats["purity"], 5 / 6)
+        self.assertIsNone(stats["coverage"])
+        self.assertAlmostEqual(evaluate.evaluate([0, 0, 1, 1], ["a", "a", "b", "b"])["ari"], 1.0)
+        self.assertAlmostEqual(evaluate.evaluate([0, 1, 0, 1], ["a", "a", "b", "b"])["ari"], -0.5)
+
+    def test_factorize(self):
+        codes, tags = evaluate.factorize(self.read_tags)
+        self.assertEqual(codes.tolist(), [0, 1, 0, 2, 1, 0])
+        self.assertEqual(tags, ["a", "c", "b"])
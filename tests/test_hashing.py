@@ -0,0 +1,38 @@
+import unittest
+
+from clover import hashing
+
+
+class TestBatchHash(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.read_len = 30
+        self.reads = ["ATGCATGCAATTGGCCATGCAAGGTTCCAT",
+                      "TTTTGGGGCCCCAAAATTTTGGGGCCCCAA",
+                      "ATGCATGCAATTGGCC"]
+
+    def test_batch_hash(self):
+        offsets = hashing.fragment_offsets(self.read_len)
+        expected = [[hashing.hash_value(read[i:i + 8]) for i in offsets] for read in self.reads]
+        self.assertEqual(hashing.batch_hash(self.reads, self.read_len).tolist(), expected)
+
+    def test_short_read_len(self):
+        expected = [[hashing.hash_value("AAAAAA"[i:i + 8]) for i in hashing.fragment_offsets(6)]]
+        self.assertEqual(hashing.batch_hash(["AAAAAA"], 6).tolist(), expected)
+
+    def test_sketch(self):
+        offsets = hashing.spaced_offsets(self.read_len, 4, 6, 3)
+        self.assertEqual(offsets, (0, 7, 14, 22))
+        expected = [[min(hashing.hash_value(read[i + d:i + d + 6], 6) for d in range(3)) for i in offsets]
+                    for read in self.reads[:2]]
+        self.assertEqual(hashing.batch_hash(self.reads[:2], self.read_len, 6, offsets, 3).tolist(), expected)
+
+    def test_drift(self):
+        offsets = hashing.fragment_offsets(self.read_len)
+        drifts = (0, -1, 1, -2, 2)
+        hashes = hashing.batch_hash(self.reads[:2], self.read_len, drifts=drifts)
+        expected = [[[hashing.hash_value(read[i + d:i + d + 8]) for d in drifts] for i in offsets] for read in self.reads[:2]]
+        self.assertEqual(hashes.tolist(), expected)
+        shifted = hashing.batch_hash(self.reads[:2], self.read_len, offsets=(1, 12), window=2, drifts=(-2, 0))
+        self.assertEqual(shifted[:, 0, 0].tolist(), [-1, -1])
+        self.assertEqual(shifted[:, :, 1].tolist(), hashing.batch_hash(self.reads[:2], self.read_len, offsets=(1, 12), window=2).tolist())
@@ -0,0 +1,56 @@
+import unittest
+
+from clover import index
+
+
+class TestFragmentIndex(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.front = index.FragmentIndex()
+        self.middle = index.FragmentIndex()
+        self.front.add(index.max_hash(), 1)
+        self.front.add(255, 2)
+        self.middle.add(255, 2)
+        self.middle.add(255, 3)
+
+    def test_first_common(self):
+        self.assertEqual(index.first_common(self.front.get(255), self.middle.get(255)), 2)
+        back = index.FragmentIndex()
+        back.add(7, 3)
+        back.add(7, 2)
+        self.assertEqual(index.first_common_all([self.middle.get(255), self.front.get(255), back.get(7)]), 2)
+        self.assertIsNone(index.first_common_all([self.front.get(index.max_hash()), self.middle.get(255), back.get(7)]))
+
+    def test_first_shared(self):
+        back = index.FragmentIndex()
+        back.add(7, 3)
+        back.add(7, 2)
+        buckets = [self.front.get(255), self.middle.get(255), None, back.get(7)]
+        self.assertEqual(index.first_shared(buckets, 2), 2)
+        self.assertEqual(index.first_shared(buckets, 3), 2)
+        self.assertEqual(index.first_shared(buckets, 1), 2)
+        self.assertIsNone(index.first_shared(buckets, 4))
+        self.assertEqual(index.first_shared([self.middle.get(255), back.get(7)], 2), 2)
+
+    def test_match_groups(self):
+        self.assertEqual(index.match_groups(3), ((0, 1), (0, 2), (1, 2)))
+        self.assertEqual(len(index.match_groups(5, 3)), 10)
+
+    def test_move(self):
+        self.front.move(255, 300, 2)
+        self.assertIsNone(self.front.get(255))
+        self.assertEqual(list(self.front.get(300)), [2])
+        self.assertEqual(len(self.front), 2)
+
+    def test_sparse(self):
+        sparse = index.FragmentIndex(22)
+        self.assertIsInstance(sparse.buckets, index.SparseBuckets)
+        sparse.add(index.max_hash(22), 1)
+        sparse.add(5, 2)
+        sparse.move(5, 9, 2)
+        self.assertIsNone(sparse.get(5))
+        self.assertEqual(list(sparse.get(index.max_hash(22))), [1])
+        hashes, ids = sparse.to_arrays()
+        self.assertEqual(hashes.tolist(), [9, index.max_hash(22)])
+        rebuilt = index.FragmentIndex.from_arrays(hashes, ids, 22)
+        self.assertEqual(len(rebuilt), 2)
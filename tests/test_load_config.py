@@ -0,0 +1,58 @@
+import dataclasses
+import json
+import os
+import tempfile
+import unittest
+
+from clover import load_config
+
+
+class TestConfig(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "config.json")
+        with open(self.path, "w") as f:
+            json.dump({"read_len": 100, "batch_size": 500, "merge_mode": True}, f)
+
+    def tearDown(self) -> None:
+        self.dir.cleanup()
+
+    def test_derived_entries(self):
+        config = load_config.default_config({"read_len": 150})
+        self.assertEqual(config.read_len_min, 145)
+        self.assertEqual(config.Vertical_drift, (-3, -2, -1, 0, 1, 2, 3))
+        self.assertEqual(config.verify_distance, 37)
+        self.assertTrue(load_config.out_put_config(["-L", "150", "--verify-distance=20"], {}).verify_mode)
+        config = load_config.out_put_config(["-L", "150", "--verify", "--verify-jobs=4"], {})
+        self.assertEqual((config.verify_jobs, config.jobs, config.pool_mode), (4, 0, False))
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            config.read_len = 100
+
+    def test_priority(self):
+        environ = {"CLOVER_BATCH_SIZE": "2000", "CLOVER_MERGE_MODE": "false", "CLOVER_READ_LEN": "120"}
+        config = load_config.out_put_config(["--config=" + self.path, "-L", "150", "-V", "1", "-O", "out"], environ)
+        self.assertEqual(config.read_len, 150)
+        self.assertEqual(config.batch_size, 2000)
+        self.assertFalse(config.merge_mode)
+        self.assertEqual(config.Vertical_drift, (-1, 0, 1))
+        self.assertEqual(config.output_file, "out.txt")
+
+    def test_bad_entries(self):
+        with self.assertRaises(ValueError):
+            load_config.default_config({"read_length": 150})
+        with self.assertRaises(ValueError):
+            load_config.default_config({"read_len": "long"})
+        with self.assertRaises(ValueError):
+            load_config.out_put_config([], {"CLOVER_MERGE_MODE": "maybe"})
+        with self.assertRaises(ValueError):
+            load_config.out_put_config(["--output-format", "csv"], {})
+
+    def test_sketch_entries(self):
+        self.assertEqual(load_config.default_config({"read_len": 150}).sketch_offsets, (50, 71, 92))
+        config = load_config.out_put_config(["-L", "150", "--sketch=4", "--fragment-len=10", "--window=3"], {})
+        self.assertEqual(config.sketch_offsets, (0, 46, 92, 138))
+        with self.assertRaises(ValueError):
+            load_config.default_config({"match_nums": 4})
+        with self.assertRaises(ValueError):
+            load_config.default_config({"fragment_len": 31})
@@ -0,0 +1,32 @@
+import itertools
+import unittest
+
+import numpy as np
+
+from clover import merge
+
+
+class TestMergePartitions(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.representatives = [[[1, 2, 3], [4, 5, 6]],
+                                [[1, 2, 9], [7, 8, 9]],
+                                [[4, 0, 6], [1, 5, 3]]]
+
+    def test_merge_partitions(self):
+        labels = merge.merge_partitions(self.representatives)
+        self.assertEqual([l.tolist() for l in labels], [[0, 1], [0, 2], [1, 0]])
+
+    def test_same_partition(self):
+        labels = merge.merge_partitions([[[1, 2, 3], [1, 2, 4]]])
+        self.assertEqual(labels[0].tolist(), [0, 1])
+
+    def test_count_edges(self):
+        rng = np.random.default_rng(3)
+        reps = rng.integers(0, 3, size=(40, 5))
+        part = np.repeat(np.arange(4), 10)
+        expected = [(i, j) for i, j in itertools.combinations(range(40), 2)
+                    if part[i] != part[j] and np.sum(reps[i] == reps[j]) >= 3]
+        self.assertEqual(sorted(map(tuple, merge.count_edges(reps, part, 3).tolist())), expected)
+        labels = merge.merge_partitions([[[1, 2, 3, 4, 5], [9, 9, 9, 9, 9]], [[1, 2, 3, 0, 0], [9, 9, 0, 0, 1]]], 3)
+        self.assertEqual([l.tolist() for l in labels], [[0, 1], [0, 2]])
@@ -0,0 +1,45 @@
+import os
+import tempfile
+import unittest
+
+from clover import output
+
+
+class TestClusterOutput(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.read_tags = ["r0", "r1", "r2"]
+        self.shards = [([[0, 2], [1]], self.read_tags),
+                       ([[0]], ["s0"])]
+
+    def tearDown(self) -> None:
+        self.dir.cleanup()
+
+    def write_shards(self, output_format):
+        paths = []
+        for k, (members, tags) in enumerate(self.shards):
+            path = os.path.join(self.dir.name, "part%d.%s" % (k, output_format))
+            output.write_clusters(path, members, tags, output_format)
+            paths.append(path)
+        return paths
+
+    def test_concat_tsv(self):
+        paths = self.write_shards("tsv")
+        path = os.path.join(self.dir.name, "out.txt")
+        output.concat_shards(paths, output.offset_labels([2, 1]), path)
+        clusters, tags = output.read_clusters(path)
+        self.assertEqual(clusters.tolist(), [0, 0, 1, 2])
+        self.assertEqual(tags, ["r0", "r2", "r1", "s0"])
+
+    def test_concat_npz_merged(self):
+        paths = self.write_shards("npz")
+        path = os.path.join(self.dir.name, "out.npz")
+        output.concat_shards(paths, [[0, 1], [1]], path, "npz")
+        clusters, tags = output.read_clusters(path, "npz")
+        self.assertEqual(clusters.tolist(), [0, 0, 1, 1])
+        self.assertEqual(tags, ["r0", "r2", "r1", "s0"])
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            output.write_clusters(os.path.join(self.dir.name, "x"), [], [], "csv")
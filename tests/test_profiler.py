@@ -0,0 +1,33 @@
+import unittest
+
+from clover import profiler
+
+
+class TestProfiler(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.profiler = profiler.Profiler()
+
+    def test_counters_timers(self):
+        self.profiler.count("reads", 3)
+        self.profiler.count("reads")
+        with self.profiler.timer("hash"):
+            pass
+        self.assertEqual(list(self.profiler.timed_iter([1, 2], "parse")), [1, 2])
+        report = self.profiler.report()
+        self.assertEqual(report["counters"], {"reads": 4})
+        self.assertEqual(set(report["timers"]), {"hash", "parse"})
+
+    def test_null_profiler(self):
+        null = profiler.make_profiler(False)
+        null.count("reads")
+        with null.timer("hash"):
+            pass
+        self.assertEqual(list(null.timed_iter([1], "parse")), [1])
+        self.assertEqual(null.report(), {"counters": {}, "timers": {}})
+
+    def test_merge_reports(self):
+        self.profiler.count("reads", 2)
+        self.profiler.add_time("hash", 0.5)
+        merged = profiler.merge_reports([self.profiler.report(), self.profiler.report()])
+        self.assertEqual(merged, {"counters": {"reads": 4}, "timers": {"hash": 1.0}})
@@ -0,0 +1,77 @@
+import bz2
+import gzip
+import os
+import tempfile
+import unittest
+
+from clover import reader
+
+
+class TestReadChunks(unittest.TestCase):
+
+    def setUp(self) -> None:
+        fd, self.path = tempfile.mkstemp(suffix=".txt")
+        with os.fdopen(fd, "w") as f:
+            f.write("1 AAAA\n2 ANAA\n3 TTTT\n4 GG*G\n5 CCCC\n")
+
+    def tearDown(self) -> None:
+        os.remove(self.path)
+
+    def test_read_chunks(self):
+        chunks = list(reader.read_chunks(self.path, 2))
+        self.assertEqual(chunks, [[("1", "AAAA"), ("3", "TTTT")], [("5", "CCCC")]])
+
+
+class TestIterRecords(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_fasta(self):
+        path = os.path.join(self.tmp.name, "reads.fa")
+        with open(path, "w") as f:
+            f.write(">r1 sample\nAAAA\nTTTT\n>r2\nGGGG\n")
+        self.assertEqual(list(reader.iter_records(path)), [("r1", "AAAATTTT"), ("r2", "GGGG")])
+
+    def test_fastq_gz(self):
+        path = os.path.join(self.tmp.name, "reads.fastq.gz")
+        with gzip.open(path, "wt") as f:
+            f.write("@r1\nACGT\n+\n@@@@\n@r2 x\nTTGG\n+\nIIII\n")
+        self.assertEqual(reader.detect_format(path), "fastq")
+        self.assertEqual(list(reader.iter_records(path)), [("r1", "ACGT"), ("r2", "TTGG")])
+
+    def test_txt_bz2(self):
+        path = os.path.join(self.tmp.name, "reads.txt.bz2")
+        with bz2.open(path, "wt") as f:
+            f.write("1 ACGT\n2 TTGG\n")
+        self.assertEqual(list(reader.iter_records(path)), [("1", "ACGT"), ("2", "TTGG")])
+        self.assertTrue(reader.is_compressed(path))
+        self.assertFalse(reader.is_compressed(path[:-4]))
+
+
+class TestScanMapped(unittest.TestCase):
+
+    def setUp(self) -> None:
+        fd, self.path = tempfile.mkstemp(suffix=".txt")
+        with os.fdopen(fd, "wb") as f:
+            f.write(b"1 AAAA\r\n2 ANAA\n3 TTTT\n10 ATGC")
+
+    def tearDown(self) -> None:
+        os.remove(self.path)
+
+    def records(self, prefix):
+        buf = reader.map_input(self.path)
+        records = []
+        for view, tag_starts, seq_starts, seq_lens in reader.scan_mapped(buf, 0, len(buf), prefix, window=8):
+            for t, s, l in zip(tag_starts, seq_starts, seq_lens):
+                records.append([view[t:s - 1].tobytes().decode(), view[s:s + l].tobytes().decode()])
+        return records
+
+    def test_scan_mapped(self):
+        self.assertEqual(self.records(b""), [["1", "AAAA"], ["3", "TTTT"], ["10", "ATGC"]])
+
+    def test_prefix(self):
+        self.assertEqual(self.records(b"A"), [["1", "AAAA"], ["10", "ATGC"]])
@@ -0,0 +1,29 @@
+import unittest
+
+import numpy as np
+
+from clover import simulate
+
+
+class TestSimulate(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.rng = np.random.default_rng(1)
+
+    def test_mutate(self):
+        strands = simulate.random_strands(3, 20, self.rng)
+        codes, lengths = simulate.mutate(strands, 0, 0, 0, self.rng)
+        self.assertEqual(codes.tolist(), strands.reshape(-1).tolist())
+        codes, lengths = simulate.mutate(strands, 0, 1, 0, self.rng)
+        self.assertEqual(lengths.tolist(), [40, 40, 40])
+        self.assertEqual(codes[1::2].tolist(), strands.reshape(-1).tolist())
+        codes, lengths = simulate.mutate(strands, 1, 0, 1, self.rng)
+        self.assertEqual(lengths.tolist(), [0, 0, 0])
+
+    def test_simulate_reads(self):
+        records = simulate.simulate_reads(10, 3, 30, seed=7)
+        self.assertEqual(len(records), 30)
+        self.assertEqual(sorted(tag for tag, _ in records), sorted(str(i) for i in range(10) for _ in range(3)))
+        self.assertEqual(records, simulate.simulate_reads(10, 3, 30, seed=7))
+        exact = simulate.simulate_reads(10, 3, 30, 0, 0, 0, seed=7)
+        self.assertEqual(len({read for tag, read in exact if tag == "0"}), 1)
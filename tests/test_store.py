@@ -0,0 +1,43 @@
+import os
+import tempfile
+import unittest
+
+from clover import hashing
+from clover import store
+
+
+class TestPackedReads(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.records = [("1", "ATGCATGCAATTGGCCATGCAAGGTTCCAT"),
+                        ("2", "ANGC"),
+                        ("3", "TTTTGGGGCCCCAAAATTTTGGGGCCCCA"),
+                        ("4", "GGAC")]
+        self.reads = store.PackedReads.from_records(self.records)
+
+    def test_from_records(self):
+        self.assertEqual(self.reads.tags(), ["1", "3", "4"])
+        self.assertEqual([self.reads.seq(i) for i in range(len(self.reads))],
+                         [self.records[0][1], self.records[2][1], self.records[3][1]])
+
+    def test_take_concat(self):
+        reads = store.PackedReads.concat([self.reads.take([2, 0]), self.reads.take([1])])
+        self.assertEqual(reads.tags(), ["4", "1", "3"])
+        self.assertEqual(reads.seq(2), self.records[2][1])
+
+    def test_prefix_keys(self):
+        self.assertEqual(self.reads.prefix_keys(2).tolist(), [1, 5, 10])
+
+    def test_hash_packed(self):
+        seqs = [self.reads.seq(i) for i in range(len(self.reads))]
+        self.assertEqual(hashing.hash_packed(self.reads, 30).tolist(), hashing.batch_hash(seqs, 30).tolist())
+
+    def test_spill(self):
+        with tempfile.TemporaryDirectory() as spill_dir:
+            path = os.path.join(spill_dir, "bucket0")
+            self.assertEqual(list(store.iter_spill(path)), [])
+            store.append_spill(path, self.reads.take([0]))
+            store.append_spill(path, self.reads.take([2, 1]))
+            chunks = list(store.iter_spill(path))
+        self.assertEqual([chunk.tags() for chunk in chunks], [["1"], ["4", "3"]])
+        self.assertEqual(chunks[1].seq(1), self.records[2][1])
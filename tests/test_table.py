@@ -0,0 +1,36 @@
+import unittest
+
+from clover import table
+
+
+class TestClusterTable(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.table = table.ClusterTable(fragment_nums=1, slot_nums=2)
+        first = self.table.new_cluster((10,))
+        second = self.table.new_cluster((20,))
+        for idx, hash_val in [(first, 10), (second, 20), (first, 11), (first, 12), (first, 12), (first, 10)]:
+            self.table.add_read(idx, (hash_val,))
+
+    def test_histogram(self):
+        self.assertEqual(self.table.histogram(0, 0), {10: 2, 11: 1, 12: 2})
+        self.assertEqual(self.table.size.tolist(), [5, 1])
+
+    def test_most_common(self):
+        self.assertEqual(self.table.most_common(0, 0), 12)
+
+    def test_members(self):
+        self.assertEqual(self.table.members(), [[0, 2, 3, 4, 5], [1]])
+        self.assertEqual(self.table.members(2), [[2, 3, 4, 5], []])
+        self.assertEqual(table.cluster_members([1, 0, 1, 2], 3, 1), [[1], [2], [3]])
+
+
+class TestTopTracking(unittest.TestCase):
+
+    def test_top_matches_histogram(self):
+        clusters = table.ClusterTable(fragment_nums=1)
+        idx = clusters.new_cluster((3,))
+        for hash_val in [3, 5, 5, 3, 7, 7, 7, 5, 5, 3, 3, 9]:
+            clusters.add_read(idx, (hash_val,))
+            counts = clusters.histogram(idx, 0)
+            self.assertEqual(clusters.most_common(idx, 0), max(zip(counts.values(), counts.keys()))[1])
@@ -0,0 +1,30 @@
+import unittest
+
+import numpy as np
+
+from clover import transport
+
+
+class TestTransport(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.num_dict = {"allsum_read_num": 3,
+                         "allsum_tag": ["t1", "t2"],
+                         "allread_cluster": np.array([0, 1, 0], dtype=np.int64),
+                         "allrepresentatives": np.arange(6, dtype=np.int64).reshape(2, 3)}
+
+    def test_round_trip(self):
+        results = transport.publish(self.num_dict)
+        self.assertEqual(set(results), {"allsum_read_num", transport.SHM_KEY})
+        num_dict = transport.receive(results)
+        self.assertEqual(num_dict["allsum_read_num"], 3)
+        self.assertEqual(num_dict["allsum_tag"], ["t1", "t2"])
+        self.assertEqual(num_dict["allread_cluster"].tolist(), [0, 1, 0])
+        self.assertEqual(num_dict["allrepresentatives"].tolist(), [[0, 1, 2], [3, 4, 5]])
+
+    def test_nothing_shared(self):
+        self.assertEqual(transport.receive(transport.publish({"allerror_num": 0})), {"allerror_num": 0})
+
+    def test_failure(self):
+        with self.assertRaisesRegex(RuntimeError, "Process all failed"):
+            transport.receive(transport.failure("all", ValueError("bad input")))
@@ -64,4 +64,38 @@ class TestFuzzFin(unittest.TestCase):
 
     def test_fuzz_fin(self):
         search_result = self.tree.fuzz_fin(self.word_2,10)
-        self.assertEqual(search_result,[2,1])
\ No newline at end of file
+        self.assertEqual(search_result,[2,1])
+
+
+class TestFlatTrie(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tree = tree.Trie()
+        self.flat_tree = tree.FlatTrie()
+        self.words = ["AAAA","AATC","GCTA","GCTT","CATG"]
+        for label, word in enumerate(self.words):
+            self.tree.insert(word,label)
+            self.flat_tree.insert(word,label)
+        self.tree.delete("GCTT")
+        self.flat_tree.delete("GCTT")
+
+    def test_same_results(self):
+        self.assertEqual(len(self.flat_tree),16)
+        for word in ["AAAA","GCTT","GCT","GG","ATAA","AATG","GCAA","CTTG","AAA"]:
+            self.assertEqual(self.flat_tree.searchPrefix(word),self.tree.searchPrefix(word))
+            self.assertEqual(self.flat_tree.fuzz_align(word),self.tree.fuzz_align(word))
+        for word in ["ATAA","AATG","CTTG","GCTA"]:
+            self.assertEqual(self.flat_tree.fuzz_fin(word,10),self.tree.fuzz_fin(word,10))
+
+
+class TestFuzzFinBound(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tree = tree.FlatTrie()
+        self.tree.insert("AAAAAA",3)
+        self.tree.insert("GGGGGG",4)
+
+    def test_fuzz_fin_bound(self):
+        self.assertEqual(self.tree.fuzz_fin("ATAATA",10),[3,2])
+        self.assertEqual(self.tree.fuzz_fin("ATAATA",1),["",1000])
+        self.assertEqual(self.tree.fuzz_fin("GGGGGG",10),[4,0])
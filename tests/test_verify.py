@@ -0,0 +1,49 @@
+import unittest
+
+import numpy as np
+
+from clover import align
+from clover import simulate
+from clover import verify
+
+
+class TestSplitClusters(unittest.TestCase):
+
+    def setUp(self) -> None:
+        records = simulate.simulate_reads(3, 4, 60, seed=2)
+        self.seqs = [read for tag, read in records]
+        self.labels = [int(tag) for tag, read in records]
+
+    def test_distances(self):
+        found = verify.distances(self.seqs[:4], self.seqs[4:8], 10)
+        expected = [align.edit_distance(read_1, read_2) for read_1, read_2 in zip(self.seqs[:4], self.seqs[4:8])]
+        self.assertEqual(found.tolist(), expected)
+        self.assertEqual(verify.distances(["ACGT"], ["ACGTACGTACGT"], 3).tolist(), [4])
+
+    def test_split_merged(self):
+        read_cluster = np.zeros(len(self.seqs), dtype=np.int64)
+        labels, cluster_nums = verify.split_clusters(self.seqs, read_cluster, 1, 15)
+        self.assertEqual(cluster_nums, 3)
+        self.assertEqual(len(set(zip(labels.tolist(), self.labels))), 3)
+
+    def test_keep_pure(self):
+        read_cluster = np.array(self.labels, dtype=np.int64)
+        labels, cluster_nums = verify.split_clusters(self.seqs, read_cluster, 3, 15)
+        self.assertEqual(cluster_nums, 3)
+        self.assertEqual(labels.tolist(), self.labels)
+
+    def test_leader_rounds(self):
+        # families of close reads mixed with reads far from all the others, in one cluster
+        far = [read for tag, read in simulate.simulate_reads(9, 1, 60, 0, 0, 0, seed=7)]
+        seqs = self.seqs + far
+        labels, cluster_nums = verify.split_clusters(seqs, [0] * len(seqs), 1, 15)
+        leaders = []
+        expected = {}
+        for read in range(len(seqs)):
+            leader = next((leader for leader in leaders if align.edit_distance(seqs[leader], seqs[read]) <= 15), None)
+            if leader is None:
+                leaders.append(read)
+                leader = read
+            expected[read] = leader
+        self.assertEqual(cluster_nums, len(leaders))
+        self.assertEqual(len(set(zip(labels.tolist(), expected.values()))), len(leaders))